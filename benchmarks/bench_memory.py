@@ -0,0 +1,137 @@
+#
+#    bench_memory.py
+#
+#    Memory taken by a synthetic multi-year project once loaded, and all its
+#    sprints made into Sprint, SprintTask, Scrum and ScrumTask objects.
+#
+#    Measured twice: with the model classes as they are, and as a baseline
+#    with the same classes without __slots__, each object with a __dict__,
+#    and with task ids and developers not interned.
+#
+#    Usage:
+#
+#        python benchmarks/bench_memory.py [years]
+#
+#    Weekly sprints of 40 tasks among 8 developers, 5 scrums each.
+#
+import os, sys, gc, json, random, tempfile, tracemalloc, time
+
+YEARS      = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+SPRINTS    = YEARS * 52
+TASKS      = 40
+SCRUMS     = 5
+DEVELOPERS = ['ana', 'ben', 'cara', 'dan', 'eve', 'finn', 'gus', 'hugh']
+
+
+def make_project():
+    #
+    #  Project data as in the json data file.
+    #
+    random.seed(1)
+    sprint_list = []
+    issue = 1000
+    for n in range(1, SPRINTS + 1):
+        tasks = []
+        for i in range(TASKS):
+            issue += 1
+            devel = random.choice(DEVELOPERS)
+            tasks.append({'task_id': '%s:%d' % (devel, issue), 'issue': issue, 'devel': devel,
+                          'desc': 'Task %d of sprint %d, some work to do' % (i, n), 'date': time.time()})
+        scrums = []
+        for s in range(SCRUMS + 1):
+            updates = []
+            for t in tasks:
+                if s and random.random() < 0.6:
+                    updates.append({'task_id': t['task_id'], 'progress': str(min(100, s * 20)),
+                                    'blocker': '' if random.random() < 0.9 else 'Waiting on review',
+                                    'today': random.random() < 0.5, 'date': time.time()})
+            scrums.append({'scrum_number': s, 'scrum_active': False, 'scrum_task_list': updates})
+        sprint_list.append({'sprint_number': n, 'sprint_date': int(time.time()), 'sprint_active': False,
+                            'sprint_task_list': tasks, 'dev_list': sorted(set(t['devel'] for t in tasks)),
+                            'scrum_list': scrums})
+    return {'name': 'bench', 'repo_url': '', 'sprint_list': sprint_list}
+
+
+def unslotted(cls):
+    #
+    #  A copy of a model class without __slots__: its objects have a __dict__.
+    #
+    members = {}
+    for name, value in cls.__dict__.items():
+        if name != '__slots__' and name not in cls.__slots__:
+            members[name] = value
+    return type(cls.__name__, (), members)
+
+
+class NoIntern:
+    #
+    #  The sys module, as the model classes use it, without interning.
+    #
+    def __getattr__(self, name):
+        return getattr(sys, name)
+
+    def intern(self, s):
+        return s
+
+
+def measure(sv):
+    #
+    #  Load the project and make every sprint into objects.  Returns the
+    #  project, the memory held and the peak, and the time taken.
+    #
+    gc.collect()
+    tracemalloc.start()
+    start = time.time()
+    proj  = sv.Project(sv.Data())
+    for sprint in proj.sprint_list:
+        pass
+    elapsed = time.time() - start
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return proj, size, peak, elapsed
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'project_data')
+    with open(path, 'w') as f:
+        json.dump(make_project(), f)
+
+    os.environ['SPRINTVIEW_PATH']              = path
+    os.environ['SPRINTVIEW_LOGDIR']            = tmp
+    os.environ['SPRINTVIEW_WARM_UP']           = 'off'
+    os.environ['SPRINTVIEW_SPRINT_CACHE_SIZE'] = str(SPRINTS + 1)    #  Keep all sprints as objects.
+    os.environ['DEBUG']                        = 'off'
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    import sprintview as sv
+
+    sv.init()
+
+    #
+    #  Baseline first, so that it doesn't find task ids interned already.
+    #
+    classes = {}
+    for name in ('Sprint', 'Scrum', 'SprintTask', 'ScrumTask'):
+        classes[name] = getattr(sv, name)
+        setattr(sv, name, unslotted(classes[name]))
+    sv.sys = NoIntern()
+    proj, base_size, base_peak, base_elapsed = measure(sv)
+    del proj
+    sv.sys = sys
+    for name in classes:
+        setattr(sv, name, classes[name])
+
+    proj, size, peak, elapsed = measure(sv)
+
+    tasks   = sum(len(s.task_list) for s in proj.sprint_list)
+    updates = sum(len(c.task_list) for s in proj.sprint_list for c in s.scrum_list)
+    print('%d sprints, %d sprint tasks, %d scrum tasks' % (SPRINTS, tasks, updates))
+    print('baseline, no slots or interning: %.1f MB held, peak %.1f MB, %.2f seconds, %d bytes per task and its updates'
+          % (base_size / 1e6, base_peak / 1e6, base_elapsed, base_size / tasks))
+    print('model classes:                   %.1f MB held, peak %.1f MB, %.2f seconds, %d bytes per task and its updates'
+          % (size / 1e6, peak / 1e6, elapsed, size / tasks))
+    print('memory held reduced by %d%%' % round(100 * (1 - size / base_size)))
+
+
+if __name__ == '__main__':
+    main()
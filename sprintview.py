@@ -31,7 +31,7 @@
 
         View: A view is defined by a sprint number, a scrum number, a sort column, and a sort order.
 
-    Once a view, as defined by the tuple above, has been generated, it is cached
+    Each browser keeps its own view in a cookie.  Once a view, as defined by the tuple above, has been generated, it is cached
     to a memory cache and retrieved on demand.
 
     Work cycle:
@@ -56,13 +56,26 @@ from django.core.management import execute_from_command_line
 from django.core.wsgi import get_wsgi_application
 from django.template import Context, Template
 from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from django.conf import settings
 from django.conf.urls import url
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 import datetime
+import sqlite3
 import requests
 import logging
+import hashlib
 import base64
+import io
+import shutil
+import threading
+import fcntl
 import time
+import copy
 import json
 import sys
 import ast
@@ -72,23 +85,32 @@ import os
 #
 #  Globals
 #
-proj   = None  # Umbrella data container.
-view   = None  # Display HTML page data and vars.
-inited = False # Server just up.
+proj         = None  # Umbrella data container.
+gitlab       = None  # Gitlab API client.
+issue_cache  = None  # Cache of Gitlab issue data, see IssueCache.
+inited       = False # Server just up.
+data_version = None  # Data store version proj was read at, see publish_version().
+templates    = {}    # Compiled page templates by name.
+prewarm_pool = None  # Thread rendering views ahead, see prewarm().
+prewarm_pid  = None  # Process prewarm_pool was made in.
+prewarm_todo = set() # Views queued for it, by project version and view state.
+stats        = {     # Counters shown by /stats.
+    'saves'             : 0,   # Project saves to the data store.
+    'skipped_saves'     : 0,   # Saves avoided, nothing had changed.
+    'issue_hits'        : 0,   # Issues found fresh in the issue cache.
+    'issue_misses'      : 0,   # Issues not cached, fetched from Gitlab.
+    'issue_revalidated' : 0,   # Expired cached issues Gitlab confirmed unchanged.
+    'startup_seconds'   : 0,   # Time to load the project and render the first board.
+    'prewarmed'         : 0,   # Views rendered ahead, see prewarm() and warm_up().
+}
 
 #
-#  HTML Template
-#
-#  Main app page.
+#  Style sheet of the main app page.
 #
-#  Uses a series of flex containers
+#  Plain CSS, no template tags.  Goes inline into the page template when
+#  it's compiled, or served as /sprintview.css (see STATIC_CSS).
 #
-page = '''
-<!DOCTYPE html>
-<html>
-<head>
-<meta charset="UTF-8">
-<style>
+page_css = '''
     /*
      *  CSS Reset
      */
@@ -143,7 +165,6 @@ page = '''
         position: fixed;
         top: 23%;
         left: 1%;
-        height: {{ mid_height }}%;
         margin-bottom: .5%;
         width: 99%;
         display: flex;
@@ -161,7 +182,6 @@ page = '''
         bottom: 0;
         left: 0;
         width: 100%;
-        height: {{ bot_height }}%;
         display: flex;
         -webkit-display: flex;
         flex-direction: column;
@@ -297,13 +317,6 @@ page = '''
     .update_dropdown_content a:hover {
         background-color: #f1f1f1
     }
-    .update_dropdown:hover .update_dropdown_content {
-        {% if scrum_active %}
-            visibility: visible;
-        {% else %}
-            visibility: hidden;
-        {% endif %}
-    }
     .update_dropdown:hover .update_button {
         background-color: #3e8e41;
     }
@@ -571,17 +584,6 @@ page = '''
         background: #ffff80;
     }
 
-    /*
-     *  Shading of sorting labels.
-     */
-    .{{ sort_column }} {
-        {% if sort_order == "ascending" %}
-            background: linear-gradient(#ffcc00, #fffae6);
-        {% else %}
-            background: linear-gradient(#fffae6, #ffcc00);
-        {% endif %}
-    }
-
     /*
      *  Addtasks and CLI modal dialog.
      */
@@ -676,6 +678,49 @@ page = '''
         font-size: 1em;
         font-family: monospace;
     }
+'''
+
+#
+#  HTML Template
+#
+#  Main app page.
+#
+#  Uses a series of flex containers
+#
+#  The page_css marker is replaced by the style sheet when the template is
+#  compiled, the style block below has only the rules that vary per view.
+#
+page = '''
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<!-- page_css -->
+<style>
+    .mid_frame {
+        height: {{ mid_height }}%;
+    }
+    .bottom_frame {
+        height: {{ bot_height }}%;
+    }
+    .update_dropdown:hover .update_dropdown_content {
+        {% if scrum_active %}
+            visibility: visible;
+        {% else %}
+            visibility: hidden;
+        {% endif %}
+    }
+
+    /*
+     *  Shading of sorting labels.
+     */
+    .{{ sort_column }} {
+        {% if sort_order == "ascending" %}
+            background: linear-gradient(#ffcc00, #fffae6);
+        {% else %}
+            background: linear-gradient(#fffae6, #ffcc00);
+        {% endif %}
+    }
 </style>
     <title>SPRINT VIEW</title>
 </head>
@@ -1058,6 +1103,22 @@ ALLOWED_HOSTS  = ['zeuz', 'localhost']
 DEFAULT_LOGDIR = '/tmp'
 LOGGING_DIR    = os.environ.get('SPRINTVIEW_LOGDIR', DEFAULT_LOGDIR)
 
+#
+#  Cache of views and pages.  The default, locmem, is private to the process.
+#  With several worker processes use a cache they share, file or memcached,
+#  see sprintview.md.
+#
+CACHE_BACKENDS = {  #  Backend and default location.
+    'locmem'    : ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file'      : ('django.core.cache.backends.filebased.FileBasedCache', '/tmp/sprintview_cache'),
+    'memcached' : ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+}
+CACHE_TYPE     = os.environ.get('SPRINTVIEW_CACHE', 'locmem')
+CACHE_LOCATION = os.environ.get('SPRINTVIEW_CACHE_LOCATION', '')
+if CACHE_TYPE not in CACHE_BACKENDS:
+    sys.exit('Unknown SPRINTVIEW_CACHE: %s, use one of: %s' % (CACHE_TYPE, ', '.join(CACHE_BACKENDS)))
+SHARED_CACHE   = CACHE_TYPE != 'locmem'
+
 settings.configure(
     DEBUG         = DEBUG,
     SECRET_KEY    = SECRET_KEY,
@@ -1086,7 +1147,8 @@ settings.configure(
     ],
     CACHES = {
         'default' : {
-            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+            'BACKEND' : CACHE_BACKENDS[CACHE_TYPE][0],
+            'LOCATION': CACHE_LOCATION or CACHE_BACKENDS[CACHE_TYPE][1],
         }
     },
     LOGGING = {
@@ -1137,19 +1199,48 @@ from django.core.cache import cache   #  Don't put this before settings file.
 #
 DEFAULT_PROJECT     = "test_data"
 DEFAULT_PROJECT     = "i5k_workspace_json"
-PROJECT_DATA_URL    = 'https://gitlab.com/api/v3/projects/2693506/repository/files'
+GITLAB_API          = os.environ.get('SPRINTVIEW_GITLAB_API', 'https://gitlab.com/api/v3')
+PROJECT_DATA_URL    = GITLAB_API + '/projects/2693506/repository/files'
 PROJECT_DATA        = DEFAULT_PROJECT
-ISSUES_URL          = 'https://gitlab.com/api/v3/projects/1090162/issues'
+ISSUES_URL          = GITLAB_API + '/projects/1090162/issues'
 SINGLE_ISSUE_URL    = 'https://gitlab.com/i5k_Workspace/workspace_roadmap/issues'
 DEFAULT_TOKEN       = 'bBzt3zHyiMczmRXd6adm'   #  Belongs to the app.
 SPRINTVIEW_TOKEN    = os.environ.get('SPRINTVIEW_TOKEN', DEFAULT_TOKEN)
 DEFAULT_PATH        = './project_data'
 DATA_FILE           = os.environ.get('SPRINTVIEW_PATH', DEFAULT_PATH)
 DEV_NAMES           = os.environ.get('SPRINTVIEW_DEVELOPERS', '')       # login id/name lookup.
+GITLAB_POOL_SIZE    = int(os.environ.get('SPRINTVIEW_POOL_SIZE', 10))     # Gitlab connections kept open.
+GITLAB_TIMEOUT      = float(os.environ.get('SPRINTVIEW_TIMEOUT', 30))     # Seconds to connect or read.
+GITLAB_RETRIES      = int(os.environ.get('SPRINTVIEW_RETRIES', 3))        # Retries of failed Gitlab calls.
+GITLAB_BACKOFF      = float(os.environ.get('SPRINTVIEW_BACKOFF', 0.5))    # Retry delays: 0.5, 1, 2 seconds, etc.
+ISSUE_WORKERS       = int(os.environ.get('SPRINTVIEW_ISSUE_WORKERS', 8))  # Issues fetched at once by Add Tasks.
+ISSUE_CACHE_SIZE    = int(os.environ.get('SPRINTVIEW_ISSUE_CACHE_SIZE', 1000))  # Issues kept in the issue cache.
+ISSUE_TTL           = int(os.environ.get('SPRINTVIEW_ISSUE_TTL', 3600))   # Seconds before cached issues are revalidated.
+ISSUE_CACHE_FILE    = os.environ.get('SPRINTVIEW_ISSUE_CACHE', '')         # Keep the issue cache in this file.
 DATA_BACKUP         = '/tmp/project_data.bak'
+DATA_BACKUPS        = int(os.environ.get('SPRINTVIEW_BACKUPS', 5))  # Previous versions kept of the data file.
+JOURNAL             = os.environ.get('SPRINTVIEW_JOURNAL', 'off') == 'on'  # Journal changes to the data file.
+JOURNAL_FILE        = DATA_FILE + '.journal'
+JOURNAL_COMPACT     = int(os.environ.get('SPRINTVIEW_JOURNAL_COMPACT', 200))  # Journal records before a full save.
+DB_SUFFIXES         = ('.db', '.sqlite', '.sqlite3')  # A data file so named is an SQLite database.
+MANIFEST            = 'manifest.json'      # Project file of a sharded data directory.
+SHARD_NAME          = 'sprint-%04d.json'   # Sprint files of a sharded data directory.
+LOCK_FILE           = DATA_FILE + '.lock'  # Writers of all worker processes take turns on it.
 DEFAULT_SORT_COLUMN = 'dev_sort'
 DEFAULT_SORT_ORDER  = 'ascending'
+SORT_COLUMNS        = ('dev_sort', 'issue_sort', 'desc_sort', 'status_sort')
+SORT_ORDERS         = ('ascending', 'descending')
+VIEW_COOKIE         = 'sprintview_view'  # Browser cookie holding the view state.
+VIEW_COOKIE_AGE     = 365 * 24 * 3600
 VIEW_EXPIRATION     = 900  # Cached views expire in 15 minutes.
+STATIC_CSS          = os.environ.get('SPRINTVIEW_STATIC_CSS', 'off') == 'on'  # Serve page_css as /sprintview.css.
+CSS_VERSION         = hashlib.md5(page_css.encode('utf-8')).hexdigest()[:8]  # Busts browser copies of an old sheet.
+CSS_EXPIRATION      = 31536000  # Browsers keep the style sheet for a year.
+CHECK_INTERVAL      = int(os.environ.get('SPRINTVIEW_CHECK_INTERVAL', 60))  # Seconds between Gitlab change checks.
+SPRINT_CACHE_SIZE   = int(os.environ.get('SPRINTVIEW_SPRINT_CACHE_SIZE', 10))  # Sprints kept as objects, see SprintList.
+WARM_UP             = os.environ.get('SPRINTVIEW_WARM_UP', 'on') == 'on'  # Load the project before serving.
+PREWARM             = os.environ.get('SPRINTVIEW_PREWARM', 'on') == 'on'  # Render the views next to the one shown ahead.
+JSON_CHUNK          = 1 << 16  # Characters read at a time from json data files, see JsonReader.
 MIN_TOP_HEIGHT      = 22   # Minimum height of top screeen panel (nav).
 MAX_BOT_HEIGHT      = 18   # Minimum height of bottom screen (blockers) panel.
 MIN_BOT_HEIGHT      = 8    # Minimum height of bottom screen (blockers) panel.
@@ -1167,8 +1258,519 @@ og = '<mark class="orange">'
 td = '<mark class="today">'
 em = '</mark>'
 
+NO_STATUS = (0, 0, '', False, 0)   #  Status of a task without scrum updates.
+
 FILE = 0   #  Getting data from local file.
 URL  = 1   #  Getting data from Gitlab repo.
+DB   = 2   #  Getting data from an SQLite database.
+
+#
+#  Tables of the SQLite database, see Database.  Rows of sprint tasks, scrums
+#  and scrum tasks keep their order in the lists of the json data file in
+#  position.  Columns without type keep values as given, e.g. progress is a
+#  number or text, as in the json data file.
+#
+DB_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS project (
+    key         TEXT PRIMARY KEY,
+    value       TEXT
+);
+CREATE TABLE IF NOT EXISTS sprint (
+    number      INTEGER PRIMARY KEY,
+    date,
+    active      INTEGER,
+    dev_list    TEXT
+);
+CREATE TABLE IF NOT EXISTS sprint_task (
+    sprint      INTEGER,
+    position    INTEGER,
+    task_id     TEXT,
+    issue,
+    devel       TEXT,
+    desc        TEXT,
+    date,
+    PRIMARY KEY (sprint, position)
+);
+CREATE TABLE IF NOT EXISTS scrum (
+    sprint      INTEGER,
+    number      INTEGER,
+    active      INTEGER,
+    view        TEXT,
+    PRIMARY KEY (sprint, number)
+);
+CREATE TABLE IF NOT EXISTS scrum_task (
+    sprint      INTEGER,
+    scrum       INTEGER,
+    position    INTEGER,
+    task_id     TEXT,
+    progress,
+    blocker     TEXT,
+    today       INTEGER,
+    date,
+    PRIMARY KEY (sprint, scrum, position)
+);
+CREATE INDEX IF NOT EXISTS sprint_task_id    ON sprint_task (task_id);
+CREATE INDEX IF NOT EXISTS sprint_task_devel ON sprint_task (devel);
+CREATE INDEX IF NOT EXISTS sprint_task_issue ON sprint_task (issue);
+CREATE INDEX IF NOT EXISTS scrum_task_id     ON scrum_task (sprint, scrum, task_id);
+'''
+
+#
+#  Gitlab API client.
+#
+#  All Gitlab calls go through one requests session, which keeps a pool of
+#  open connections, so calls don't pay a new TCP and TLS handshake each.
+#  Failed calls, connection errors and 429/5xx replies, are retried with
+#  exponential backoff.
+#
+#  Point SPRINTVIEW_GITLAB_API to another server, e.g. a local stub, to test.
+#
+class Gitlab:
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers.update({'user-agent':'Mozilla/5.0', 'PRIVATE-TOKEN':SPRINTVIEW_TOKEN})
+
+        retry = Retry(total            = GITLAB_RETRIES,
+                      backoff_factor   = GITLAB_BACKOFF,
+                      status_forcelist = (429, 500, 502, 503, 504),
+                      raise_on_status  = False)
+        adapter = HTTPAdapter(pool_connections=GITLAB_POOL_SIZE, pool_maxsize=GITLAB_POOL_SIZE, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url, params=None, headers=None):
+        return self.session.get(url, params=params, headers=headers, timeout=GITLAB_TIMEOUT)
+
+    def put(self, url, data):
+        return self.session.put(url, data=data, timeout=GITLAB_TIMEOUT)
+
+    def get_file(self):
+        #
+        #  Get the project data file.  Content comes base64 encoded.
+        #
+        payload = {'file_path':PROJECT_DATA, 'ref': 'master'}
+        return self.get(PROJECT_DATA_URL, params=payload)
+
+    def get_blob_id(self):
+        #
+        #  Get the blob id of the project data file, without its content.
+        #  Gitlab sends it in a header of a HEAD request; servers that don't
+        #  get the whole file.  None if it can't.
+        #
+        payload = {'file_path':PROJECT_DATA, 'ref': 'master'}
+        r = self.session.head(PROJECT_DATA_URL, params=payload, timeout=GITLAB_TIMEOUT)
+        if r.status_code == 200 and 'X-Gitlab-Blob-Id' in r.headers:
+            return r.headers['X-Gitlab-Blob-Id']
+        r = self.get_file()
+        if r.status_code != 200:
+            log.warn('Failed to check URL %s: code %s' % (PROJECT_DATA_URL, r.status_code))
+            return None
+        return json.loads(r.text).get('blob_id')
+
+    def put_file(self, js):
+        payload = {'file_path': PROJECT_DATA, 'branch_name': "master", 'commit_message': 'none', 'content': js}
+        return self.put(PROJECT_DATA_URL, data=payload)
+
+    def get_issue(self, issue_id, headers=None):
+        payload = {'iid': issue_id}
+        return self.get(ISSUES_URL, params=payload, headers=headers)
+
+
+#
+#  Cache of Gitlab issue data: title, assignee, etc.
+#
+#  Least recently used issues are dropped past ISSUE_CACHE_SIZE.  Issues older
+#  than ISSUE_TTL seconds are revalidated with Gitlab using their ETag, see
+#  Sprint.get_issue().  With ISSUE_CACHE_FILE set the cache survives restarts.
+#
+#  Used from several threads, see Sprint.get_issues().
+#
+class IssueCache:
+    def __init__(self):
+        self.entries = OrderedDict()   #  [issue data, etag, time fetched] by issue id.
+        self.lock    = threading.Lock()
+
+        if ISSUE_CACHE_FILE and os.access(ISSUE_CACHE_FILE, os.R_OK):
+            try:
+                with open(ISSUE_CACHE_FILE) as f:
+                    for issue_id, entry in json.load(f):
+                        self.entries[issue_id] = entry
+                log.info('Issue cache %s: %d issues' % (ISSUE_CACHE_FILE, len(self.entries)))
+            except (IOError, ValueError) as e:
+                log.warn('Issue cache %s unreadable, ignored: %s' % (ISSUE_CACHE_FILE, e))
+
+    def lookup(self, issue_id):
+        #
+        #  Returns (issue data, etag, fresh) for a cached issue, or None.
+        #
+        with self.lock:
+            entry = self.entries.get(issue_id)
+            if not entry:
+                stats['issue_misses'] += 1
+                return None
+            self.entries.move_to_end(issue_id)
+            fresh = time.time() - entry[2] < ISSUE_TTL
+            if fresh:
+                stats['issue_hits'] += 1
+            return (entry[0], entry[1], fresh)
+
+    def store(self, issue_id, data, etag):
+        with self.lock:
+            self.entries[issue_id] = [data, etag, time.time()]
+            self.entries.move_to_end(issue_id)
+            while len(self.entries) > ISSUE_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def revalidated(self, issue_id):
+        #
+        #  Gitlab says the cached issue is current, it's fresh again.
+        #
+        with self.lock:
+            entry = self.entries.get(issue_id)
+            if entry:
+                entry[2] = time.time()
+            stats['issue_revalidated'] += 1
+
+    def save(self):
+        if not ISSUE_CACHE_FILE:
+            return
+        with self.lock:
+            js = json.dumps(list(self.entries.items()))
+        tmp = '%s.%d.tmp' % (ISSUE_CACHE_FILE, os.getpid())
+        with open(tmp, 'w') as f:
+            f.write(js)
+        os.replace(tmp, ISSUE_CACHE_FILE)
+
+#
+#  Lock taken by writers of the project, see index().
+#
+#  Threads of the process take turns on a thread lock.  With a shared cache,
+#  SHARED_CACHE, there may be other worker processes writing too, these take
+#  turns on LOCK_FILE.
+#
+class WriteLock:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.file = None
+
+    def __enter__(self):
+        self.lock.acquire()
+        if SHARED_CACHE:
+            self.file = open(LOCK_FILE, 'a')
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.file:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+        self.lock.release()
+
+write_lock = WriteLock()
+
+#
+#  SQLite database of a project.
+#
+#  Reads and writes the project as the dicts of the json data file, see
+#  Data.  Changes with change records, see Data.append(), are written as
+#  the rows they change.  In WAL mode, readers, e.g. other worker processes,
+#  don't wait for writers.
+#
+class Database:
+    def __init__(self, path):
+        self.lock = threading.Lock()    #  Threads share the connection.
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(DB_SCHEMA)
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(scrum)')]
+        if 'view' not in columns:
+            self.conn.execute('ALTER TABLE scrum ADD COLUMN view TEXT')    #  Databases from before scrum views.
+
+    def version(self):
+        #
+        #  Changes when another connection, of this process or not, writes the database.
+        #
+        with self.lock:
+            return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def read(self):
+        with self.lock:
+            c = self.conn
+            c.execute('BEGIN')      #  All reads see the same version.
+            try:
+                proj = {}
+                for key, value in c.execute('SELECT key, value FROM project'):
+                    proj[key] = json.loads(value)
+                proj['sprint_list'] = []
+                sprints = {}
+                for number, date, active, dev_list in c.execute('SELECT number, date, active, dev_list FROM sprint ORDER BY number'):
+                    spr = {}
+                    spr['sprint_number']    = number
+                    spr['sprint_date']      = date
+                    spr['sprint_active']    = bool(active)
+                    spr['sprint_task_list'] = []
+                    spr['dev_list']         = json.loads(dev_list)
+                    spr['scrum_list']       = []
+                    proj['sprint_list'].append(spr)
+                    sprints[number] = spr
+                for sprint, task_id, issue, devel, desc, date in c.execute(
+                        'SELECT sprint, task_id, issue, devel, desc, date FROM sprint_task ORDER BY sprint, position'):
+                    ti = {}
+                    ti['task_id'] = task_id
+                    ti['issue']   = issue
+                    ti['devel']   = devel
+                    ti['desc']    = desc
+                    ti['date']    = date
+                    sprints[sprint]['sprint_task_list'].append(ti)
+                scrums = {}
+                for sprint, number, active, view in c.execute('SELECT sprint, number, active, view FROM scrum ORDER BY sprint, number'):
+                    si = {}
+                    si['scrum_number']    = number
+                    si['scrum_active']    = bool(active)
+                    si['scrum_task_list'] = []
+                    if view:
+                        si['scrum_view']  = view
+                    sprints[sprint]['scrum_list'].append(si)
+                    scrums[(sprint, number)] = si
+                for sprint, scrum, task_id, progress, blocker, today, date in c.execute(
+                        'SELECT sprint, scrum, task_id, progress, blocker, today, date FROM scrum_task ORDER BY sprint, scrum, position'):
+                    ti = {}
+                    ti['task_id']  = task_id
+                    ti['progress'] = progress
+                    ti['blocker']  = blocker
+                    ti['today']    = bool(today)
+                    ti['date']     = date
+                    scrums[(sprint, scrum)]['scrum_task_list'].append(ti)
+            finally:
+                c.execute('COMMIT')
+            return proj
+
+    def write(self, proj, sprints=None):
+        #
+        #  Write the project.  Only the rows of the sprints numbered in sprints,
+        #  or of all if None, and of any missing, are written.
+        #
+        with self.lock:
+            c = self.conn
+            c.execute('BEGIN IMMEDIATE')
+            try:
+                c.execute('DELETE FROM project')
+                for key in proj:
+                    if key != 'sprint_list':
+                        c.execute('INSERT INTO project VALUES (?, ?)', (key, json.dumps(proj[key])))
+                stored  = set(number for (number,) in c.execute('SELECT number FROM sprint'))
+                numbers = set(spr['sprint_number'] for spr in proj['sprint_list'])
+                for number in stored - numbers:
+                    self._delete_sprint(number)
+                for spr in proj['sprint_list']:
+                    if sprints is None or spr['sprint_number'] in sprints or spr['sprint_number'] not in stored:
+                        self._put_sprint(spr)
+                c.execute('COMMIT')
+            except:
+                c.execute('ROLLBACK')
+                raise
+
+    def apply(self, changes):
+        #
+        #  Write change records, as the rows they change, see Data._replay().
+        #
+        with self.lock:
+            c = self.conn
+            c.execute('BEGIN IMMEDIATE')
+            try:
+                for change in changes:
+                    self._apply(change)
+                c.execute('COMMIT')
+            except:
+                c.execute('ROLLBACK')
+                raise
+
+    def _apply(self, change):
+        c  = self.conn
+        op = change['op']
+        if op == 'sprint_new':
+            self._put_sprint(change['data'])
+        elif op == 'sprint_close':
+            c.execute('UPDATE sprint SET active = 0 WHERE number = ?', (change['sprint'],))
+        elif op == 'task_add':
+            task = change['task']
+            found = c.execute('SELECT 1 FROM sprint_task WHERE sprint = ? AND task_id = ?', (change['sprint'], task['task_id'])).fetchone()
+            if not found:
+                c.execute('INSERT INTO sprint_task SELECT ?, COALESCE(MAX(position) + 1, 0), ?, ?, ?, ?, ? FROM sprint_task WHERE sprint = ?',
+                          (change['sprint'], task['task_id'], task['issue'], task['devel'], task['desc'], task['date'], change['sprint']))
+            c.execute('UPDATE sprint SET dev_list = ? WHERE number = ?', (json.dumps(change['dev_list']), change['sprint']))
+            c.execute('UPDATE scrum SET view = NULL WHERE sprint = ?', (change['sprint'],))
+        elif op == 'task_delete':
+            c.execute('DELETE FROM sprint_task WHERE sprint = ? AND task_id = ?', (change['sprint'], change['task_id']))
+            c.execute('UPDATE scrum SET view = NULL WHERE sprint = ?', (change['sprint'],))
+        elif op == 'scrum_new':
+            self._put_scrum(change['sprint'], change['data'])
+        elif op == 'scrum_close':
+            c.execute('UPDATE scrum SET active = 0 WHERE sprint = ? AND number = ?', (change['sprint'], change['scrum']))
+            if 'view' in change:
+                c.execute('UPDATE scrum SET view = ? WHERE sprint = ? AND number = ?', (change['view'], change['sprint'], change['scrum']))
+        elif op == 'scrum_view':
+            c.execute('UPDATE scrum SET view = ? WHERE sprint = ? AND number = ?', (change['view'], change['sprint'], change['scrum']))
+        elif op == 'task_update':
+            task = change['task']
+            values = (task['progress'], task['blocker'], task['today'], task['date'], change['sprint'], change['scrum'], task['task_id'])
+            cur = c.execute('UPDATE scrum_task SET progress = ?, blocker = ?, today = ?, date = ? WHERE sprint = ? AND scrum = ? AND task_id = ?', values)
+            if not cur.rowcount:
+                c.execute('INSERT INTO scrum_task SELECT ?, ?, COALESCE(MAX(position) + 1, 0), ?, ?, ?, ?, ? FROM scrum_task WHERE sprint = ? AND scrum = ?',
+                          (change['sprint'], change['scrum'], task['task_id'], task['progress'], task['blocker'], task['today'], task['date'],
+                           change['sprint'], change['scrum']))
+        else:
+            log.warn('Database: unknown record %s' % op)
+
+    def _delete_sprint(self, number):
+        for table, key in (('scrum_task', 'sprint'), ('scrum', 'sprint'), ('sprint_task', 'sprint'), ('sprint', 'number')):
+            self.conn.execute('DELETE FROM %s WHERE %s = ?' % (table, key), (number,))
+
+    def _put_sprint(self, spr):
+        c = self.conn
+        number = spr['sprint_number']
+        self._delete_sprint(number)
+        c.execute('INSERT INTO sprint VALUES (?, ?, ?, ?)',
+                  (number, spr['sprint_date'], spr['sprint_active'], json.dumps(spr.get('dev_list', []))))
+        c.executemany('INSERT INTO sprint_task VALUES (?, ?, ?, ?, ?, ?, ?)',
+                      [(number, i, t['task_id'], t['issue'], t['devel'], t['desc'], t['date']) for i, t in enumerate(spr['sprint_task_list'])])
+        for scr in spr['scrum_list']:
+            self._put_scrum(number, scr)
+
+    def _put_scrum(self, sprint, scr):
+        c = self.conn
+        c.execute('DELETE FROM scrum_task WHERE sprint = ? AND scrum = ?', (sprint, scr['scrum_number']))
+        c.execute('DELETE FROM scrum WHERE sprint = ? AND number = ?', (sprint, scr['scrum_number']))
+        view = scr.get('scrum_view')
+        if view is not None and not isinstance(view, str):
+            view = json.dumps(view, separators=(',', ':'))     #  Data from before views were kept as text.
+        c.execute('INSERT INTO scrum VALUES (?, ?, ?, ?)', (sprint, scr['scrum_number'], scr['scrum_active'], view))
+        c.executemany('INSERT INTO scrum_task VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                      [(sprint, scr['scrum_number'], i, t['task_id'], t['progress'], t['blocker'], t['today'], t['date'])
+                       for i, t in enumerate(scr['scrum_task_list'])])
+
+
+#
+#  Reads a json file a piece at a time, JSON_CHUNK characters, see
+#  stream_project().  Parsed text is dropped as it goes, the whole text is
+#  never held at once.
+#
+class JsonReader:
+    space        = re.compile(r'[ \t\n\r]*')
+    number_chars = '0123456789+-.eE'    #  Never right after a whole json value.
+
+    def __init__(self, f):
+        self.f       = f
+        self.buf     = ''       #  Text read and not yet parsed, from pos.
+        self.pos     = 0
+        self.eof     = False
+        self.size    = 0        #  Characters read so far.
+        self.decoder = json.JSONDecoder()
+
+    def _read(self):
+        #
+        #  Read the next piece of the file.  Returns False at its end.
+        #
+        if self.eof:
+            return False
+        chunk = self.f.read(JSON_CHUNK)
+        if not chunk:
+            self.eof = True
+            return False
+        self.size += len(chunk)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        #
+        #  Returns the next character that isn't white space, without taking
+        #  it.  '' at the end of the file.
+        #
+        while True:
+            self.pos = self.space.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._read():
+                return ''
+
+    def offset(self):
+        return self.size - len(self.buf) + self.pos
+
+    def take(self, chars):
+        #
+        #  Take the next character, one of chars, and return it.
+        #
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError('Expecting one of %s at character %d' % (chars, self.offset()))
+        self.pos += 1
+        return c
+
+    def value(self):
+        #
+        #  Parse the next json value whole.  A value that ends where the text
+        #  read so far does, e.g. a number, may go on in the next piece.  So
+        #  may a number cut after '1.' or '1.5e', parsed as 1 or 1.5.
+        #
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                if self.eof or (end < len(self.buf) and self.buf[end] not in self.number_chars):
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self._read()
+
+
+def stream_project(reader, project):
+    #
+    #  Parse project data, a json object, with a JsonReader, a sprint at a time.
+    #
+    #  Fills project with the fields of the object, with sprint_list empty,
+    #  and yields the sprints of sprint_list, one at a time.  Other fields
+    #  are parsed whole.  Raises ValueError if it isn't valid json.
+    #
+    reader.take('{')
+    if reader.peek() == '}':
+        reader.take('}')
+    else:
+        while True:
+            key = reader.value()
+            reader.take(':')
+            if key == 'sprint_list' and reader.peek() == '[':
+                project[key] = []
+                reader.take('[')
+                if reader.peek() == ']':
+                    reader.take(']')
+                else:
+                    while True:
+                        yield reader.value()
+                        if reader.take(',]') == ']':
+                            break
+            else:
+                project[key] = reader.value()
+            if reader.take(',}') == '}':
+                break
+    if reader.peek():
+        raise ValueError('Extra data at character %d' % reader.offset())
+
+
+def load_json(f):
+    #
+    #  Read project data from a json file, streamed, see stream_project().
+    #  Returns the data and the size of the file.
+    #
+    data   = {}
+    reader = JsonReader(f)
+    for sprint in stream_project(reader, data):
+        data['sprint_list'].append(sprint)
+    return data, reader.size
+
 
 #
 #  Get Agile project data from the GitLab Repo or a file.
@@ -1180,26 +1782,55 @@ URL  = 1   #  Getting data from Gitlab repo.
 #  The start script takes care that this is never a problem if
 #  we only use a URL habitually.
 #
+#  A local data file named *.db, *.sqlite or *.sqlite3 is an SQLite
+#  database, see Database.
+#
+#  A local data file may also be a sharded data directory: the project in
+#  MANIFEST, which lists the sprints, and each sprint in its own file,
+#  SHARD_NAME.  Saves only write the files of sprints that changed.  See
+#  shard_data() to convert a data file.
+#
 class Data:
     def __init__(self):
         self.data_url   = PROJECT_DATA_URL  #  Url of data store file (GitLab)
-        self.data       = {}                #  Project data.
+        self.data       = {}                #  Project data, until the Project takes it.
         self.accesstype = FILE              #  Default is local file data.
+        self.sharded    = os.path.isdir(DATA_FILE)  #  Data file is a sharded data directory.
+        self.stamp      = None              #  Version of the store as last read or written.
+        self.checked    = time.time()       #  Last time the Gitlab store was checked for changes.
+        self.check_lock = threading.Lock()  #  Held by the request checking it.
+        self.journaled  = 0                 #  Records in the journal since the last full save.
+        self.pending    = set()             #  Numbers of sprints changed in the journal, for shards.
+        self.db         = None              #  SQLite database, if DB.
 
         self._get_data()
-        cache.clear()
 
     def _get_data(self):
 
-        buf = ''
-
-        if DATA_FILE and os.access(DATA_FILE, os.R_OK):
+        if DATA_FILE.endswith(DB_SUFFIXES):
+            #
+            #  Get project data from a database.
+            #
+            if not os.access(DATA_FILE, os.R_OK):
+                log.error('No database %s, import a data file into it first.' % DATA_FILE)
+                sys.exit(1)
+            self.accesstype = DB
+            self.db    = Database(DATA_FILE)
+            self.data  = self.db.read()
+            self.stamp = self.db.version()
+            size       = os.path.getsize(DATA_FILE)
+            log.info('Data source DB: %s' % DATA_FILE)
+        elif DATA_FILE and os.access(DATA_FILE, os.R_OK):
             #
             #  Get project data from a file.
             #
-            with open(DATA_FILE) as f:
-                raw_data  = f.read()                # json.
-                self.data = json.loads(raw_data)    # dict.
+            if self.sharded:
+                size = self._read_shards()
+            else:
+                size = self._read_file()
+            if JOURNAL:
+                self._replay_journal()
+            self.stamp = self._file_stamp()
 
             if not self.data:
                 log.error('Data file access provided no data.')
@@ -1210,24 +1841,24 @@ class Data:
            # Read Repo from GitLab.
            #
             self.accesstype = URL
-            headers = {'user-agent':'Mozilla/5.0', 'PRIVATE-TOKEN':SPRINTVIEW_TOKEN}
-            payload = {'file_path':PROJECT_DATA, 'ref': 'master'}
-            r = requests.get(PROJECT_DATA_URL, headers=headers, params=payload)
+            r = gitlab.get_file()
             if r.status_code != 200:
                 log.error('Failed to open URL %s: code %s' % (PROJECT_DATA_URL, r.status_code))
                 sys.exit(1)
 
             data = json.loads(r.text)                          # dict.
             if 'content' in data and data['content']:
-                raw_data  = base64.b64decode(data['content'])  # json.
-                self.data = json.loads(raw_data)               # dict.
+                raw_data   = base64.b64decode(data['content'])  # json.
+                self.data, _ = load_json(io.TextIOWrapper(io.BytesIO(raw_data), encoding='utf-8'))  # dict.
+                self.stamp = data.get('blob_id')
+                size       = len(raw_data)
             else:
                 log.error('Empty json file from repo')
                 sys.exit(1)
             log.info('Data source URL: %s' % r.url)
 
         if self.data:
-            l = len(raw_data)
+            l = size
             if l >= 1024:
                 sz = l / 1024
                 log.info("Data store '%s' retrieved - size: %d KB" % (PROJECT_DATA, sz))
@@ -1238,24 +1869,374 @@ class Data:
             log.error('Access method provided no data.')
             sys.exit(1)
 
-    def save(self, proj):
+    def save(self, proj, sprints=None):
         #
         #  Save the project where it came from.
         #
-        buf = json.dumps(proj, indent=4)
-        js = buf + '\n'
+        #  sprints: numbers of the sprints changed since the last save, None if
+        #  not known.  A sharded data directory only writes these.
+        #
         if self.accesstype == FILE:
-            with open(DATA_FILE, 'w') as f:
-                f.write(js)
+            if self.sharded:
+                if sprints is not None:
+                    sprints = set(sprints) | self.pending
+                self.write_shards(proj, sprints)
+            else:
+                buf = json.dumps(proj, indent=4)
+                js = buf + '\n'
+                self._write_file(DATA_FILE, js)
+            self.pending = set()
+            if JOURNAL:
+                #
+                #  The data file has all journaled changes now.  A crash before
+                #  this point only leaves records that replay to no effect.
+                #
+                with open(JOURNAL_FILE, 'w') as f:
+                    pass
+                self.journaled = 0
+            self.stamp = self._file_stamp()
         elif self.accesstype == URL:
-            headers = {'user-agent':'Mozilla/5.0', 'PRIVATE-TOKEN':SPRINTVIEW_TOKEN}
-            payload = {'file_path': PROJECT_DATA, 'branch_name': "master", 'commit_message': 'none', 'content': js}
-            r = requests.put(PROJECT_DATA_URL, headers=headers, data=payload)
+            buf = json.dumps(proj, indent=4)
+            js = buf + '\n'
+            r = gitlab.put_file(js)
             if r.status_code != 200:
                 log.error('Failed to update project date at URL %s: code %s' % (PROJECT_DATA_URL, r.status_code))
                 sys.exit(1)
-            with open(DATA_BACKUP, 'w') as f:
-                f.write(js)
+            self._write_file(DATA_BACKUP, js)
+            self.stamp = self._blob_id(js)
+            cache.set('data_modified:%s' % self.stamp, time.time(), None)
+        elif self.accesstype == DB:
+            self.db.write(proj, sprints)
+
+    def modified(self):
+        #
+        #  Time the store was last written, the same for every worker process
+        #  reading it, and across restarts, see View.make_etag().  Gitlab has
+        #  no such time for a file, the first worker to ask for a blob sets it
+        #  in the shared cache.
+        #
+        if self.accesstype == URL:
+            key = 'data_modified:%s' % self.stamp
+            cache.add(key, time.time(), None)
+            return cache.get(key) or time.time()
+        if self.accesstype == DB:
+            paths = (DATA_FILE, DATA_FILE + '-wal')
+        else:
+            paths = (os.path.join(DATA_FILE, MANIFEST) if self.sharded else DATA_FILE, JOURNAL_FILE)
+        times = []
+        for path in paths:
+            try:
+                times.append(os.stat(path).st_mtime)
+            except OSError:
+                pass
+        return max(times)
+
+    def _read_file(self):
+        #
+        #  Read the data file.  Returns its size.
+        #
+        size, self.data = self._read_json(DATA_FILE)
+        return size
+
+    def _read_shards(self):
+        #
+        #  Read a sharded data directory, the manifest and the sprint files it
+        #  lists.  Returns their size.
+        #
+        size, manifest = self._read_json(os.path.join(DATA_FILE, MANIFEST))
+        self.data = {}
+        for key in manifest:
+            if key != 'shards':
+                self.data[key] = manifest[key]
+        self.data['sprint_list'] = []
+        for name in manifest['shards']:
+            shard_size, sprint = self._read_json(os.path.join(DATA_FILE, name))
+            size += shard_size
+            self.data['sprint_list'].append(sprint)
+        return size
+
+    def _read_json(self, path):
+        #
+        #  Read a json file, streamed, see load_json().  If it's unreadable fall
+        #  back to the most recent readable backup, see _write_file().  Returns
+        #  its size and the data.
+        #
+        for p in [path] + self._backups(path):
+            try:
+                with open(p) as f:
+                    data, size = load_json(f)
+            except (IOError, ValueError) as e:
+                log.error('Failed to read data file %s: %s' % (p, e))
+                continue
+            if p != path:
+                log.error('Data file %s unreadable, using backup %s' % (path, p))
+            return size, data
+
+        log.error('No readable data file or backup for %s.' % path)
+        sys.exit(1)
+
+    def write_shards(self, proj, sprints=None, root=DATA_FILE):
+        #
+        #  Write the project to a sharded data directory: the files of the
+        #  sprints numbered in sprints, of all if None, and of any missing,
+        #  then the manifest.  Closed sprints don't change, their files stay.
+        #
+        manifest = {}
+        for key in proj:
+            if key != 'sprint_list':
+                manifest[key] = proj[key]
+        manifest['shards'] = []
+        for spr in proj['sprint_list']:
+            name = SHARD_NAME % spr['sprint_number']
+            path = os.path.join(root, name)
+            manifest['shards'].append(name)
+            if sprints is None or spr['sprint_number'] in sprints or not os.access(path, os.F_OK):
+                self._write_file(path, json.dumps(spr, indent=4) + '\n')
+        self._write_file(os.path.join(root, MANIFEST), json.dumps(manifest, indent=4) + '\n')
+
+        #
+        #  Sprints deleted, or renumbered, may leave files of sprints no
+        #  longer in the manifest.  Their backups stay.
+        #
+        for name in os.listdir(root):
+            if re.match(r'sprint-\d+\.json$', name) and name not in manifest['shards']:
+                os.remove(os.path.join(root, name))
+
+    def _write_file(self, path, js):
+        #
+        #  Write a file so that readers, and a crash, see either the old or the new
+        #  content, never a part of it: write a temporary file, flush it to disk,
+        #  and rename it over the old one.
+        #
+        #  The old content is kept as the first backup, see _backups().
+        #
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp, 'w') as f:
+            f.write(js)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._rotate(path)
+        os.replace(tmp, path)
+
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+            try:
+                os.fsync(fd)    #  Make the rename itself durable.
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+    def _backups(self, path):
+        return ['%s.%d' % (path, i) for i in range(1, DATA_BACKUPS + 1)]
+
+    def _rotate(self, path):
+        #
+        #  Shift the backups of a file, <path>.1 to <path>.2, etc., dropping the
+        #  oldest, and make the current file <path>.1.  The current file stays in
+        #  place, linked, until the new one is renamed over it.
+        #
+        if not DATA_BACKUPS or not os.access(path, os.R_OK):
+            return
+        backups = self._backups(path)
+        for i in range(len(backups) - 1, 0, -1):
+            if os.access(backups[i - 1], os.F_OK):
+                os.replace(backups[i - 1], backups[i])
+        if os.access(backups[0], os.F_OK):
+            os.remove(backups[0])
+        try:
+            os.link(path, backups[0])
+        except OSError:
+            shutil.copy2(path, backups[0])
+
+    def append(self, changes):
+        #
+        #  Append change records to the journal instead of rewriting the data file.
+        #
+        #  Returns False if the project must be saved whole: no journal, or time
+        #  to compact the journal into the data file.
+        #
+        #  Records are compact json, one per line:
+        #
+        #      {"op": "task_update", "sprint": 5, "scrum": 2, "task": {ScrumTask}}
+        #      {"op": "scrum_new", "sprint": 5, "scrum": 3, "data": {Scrum}}
+        #      {"op": "scrum_close", "sprint": 5, "scrum": 2, "view": "[[progress,prev_progress,blocker,today],...]"}
+        #      {"op": "scrum_view", "sprint": 5, "scrum": 2, "view": "[[progress,prev_progress,blocker,today],...]"}
+        #      {"op": "sprint_new", "sprint": 6, "data": {Sprint}}
+        #      {"op": "sprint_close", "sprint": 5}
+        #      {"op": "task_add", "sprint": 5, "task": {SprintTask}, "dev_list": [...]}
+        #      {"op": "task_delete", "sprint": 5, "task_id": "matt:259"}
+        #
+        if self.accesstype == DB:
+            self.db.apply(changes)      #  No journal, the records are row writes.
+            return True
+        if self.accesstype != FILE or not JOURNAL:
+            return False
+        if self.journaled + len(changes) > JOURNAL_COMPACT:
+            return False
+
+        buf = ''
+        for change in changes:
+            buf += json.dumps(change, separators=(',', ':')) + '\n'
+        with open(JOURNAL_FILE, 'a') as f:
+            f.write(buf)
+            f.flush()
+            os.fsync(f.fileno())
+        self.journaled += len(changes)
+        for change in changes:
+            self.pending.add(change['sprint'])
+        self.stamp = self._file_stamp()
+        return True
+
+    def _replay_journal(self):
+        #
+        #  Apply the journal, if any, to the data read from the data file.
+        #
+        #  A record torn by a crash while appending it, the last one, is cut
+        #  off the journal, so that the next records appended aren't joined
+        #  to it, and lost with it.
+        #
+        if not os.access(JOURNAL_FILE, os.R_OK):
+            return
+        good = 0    #  Length of the journal up to the last whole record.
+        with open(JOURNAL_FILE, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('no end of line')
+                    change = json.loads(line)
+                except ValueError:
+                    log.warn('Journal %s: dropping truncated record: %s' % (JOURNAL_FILE, line))
+                    break
+                self._replay(change)
+                self.pending.add(change['sprint'])
+                self.journaled += 1
+                good += len(line)
+        if good < os.path.getsize(JOURNAL_FILE):
+            os.truncate(JOURNAL_FILE, good)
+        log.info('Journal %s: %d records replayed' % (JOURNAL_FILE, self.journaled))
+
+    def _replay(self, change):
+        #
+        #  Apply one change record to the project data.  Replaying a record
+        #  twice leaves the data as replaying it once.
+        #
+        op = change['op']
+        sprint_list = self.data['sprint_list']
+
+        if op == 'sprint_new':
+            self._put(sprint_list, 'sprint_number', change['data'])
+            return
+
+        spr = self._find(sprint_list, 'sprint_number', change['sprint'])
+        if not spr:
+            log.warn('Journal %s: no sprint %s for %s' % (JOURNAL_FILE, change['sprint'], op))
+            return
+
+        if op == 'sprint_close':
+            spr['sprint_active'] = False
+        elif op == 'task_add':
+            if not self._find(spr['sprint_task_list'], 'task_id', change['task']['task_id']):
+                spr['sprint_task_list'].append(change['task'])
+            spr['dev_list'] = change['dev_list']
+            for scr in spr['scrum_list']:
+                scr.pop('scrum_view', None)
+        elif op == 'task_delete':
+            tsk = self._find(spr['sprint_task_list'], 'task_id', change['task_id'])
+            if tsk:
+                spr['sprint_task_list'].remove(tsk)
+            for scr in spr['scrum_list']:
+                scr.pop('scrum_view', None)
+        elif op == 'scrum_new':
+            self._put(spr['scrum_list'], 'scrum_number', change['data'])
+        elif op == 'scrum_close':
+            scr = self._find(spr['scrum_list'], 'scrum_number', change['scrum'])
+            if scr:
+                scr['scrum_active'] = False
+                if 'view' in change:
+                    scr['scrum_view'] = change['view']
+        elif op == 'scrum_view':
+            scr = self._find(spr['scrum_list'], 'scrum_number', change['scrum'])
+            if scr:
+                scr['scrum_view'] = change['view']
+        elif op == 'task_update':
+            scr = self._find(spr['scrum_list'], 'scrum_number', change['scrum'])
+            if scr:
+                self._put(scr['scrum_task_list'], 'task_id', change['task'])
+        else:
+            log.warn('Journal %s: unknown record %s' % (JOURNAL_FILE, op))
+
+    def _find(self, items, key, value):
+        #
+        #  Find a dict by key in a list of dicts, from the end, where recent ones are.
+        #
+        for item in reversed(items):
+            if item[key] == value:
+                return item
+        return None
+
+    def _put(self, items, key, new):
+        #
+        #  Replace a dict in a list of dicts, or append it.
+        #
+        i = 0
+        for item in items:
+            if item[key] == new[key]:
+                items[i] = new
+                return
+            i += 1
+        items.append(new)
+
+    def changed(self):
+        #
+        #  Whether the store was written by someone else since we last read or wrote it.
+        #
+        #  A local file is checked on every call, it's only a stat().  Gitlab is asked at
+        #  most once every CHECK_INTERVAL seconds, by one request at a time, comparing
+        #  blob ids.  If Gitlab can't be reached the store is taken as unchanged.
+        #
+        if self.accesstype == FILE:
+            return self._file_stamp() != self.stamp
+        if self.accesstype == DB:
+            return self.db.version() != self.stamp
+
+        now = time.time()
+        if now - self.checked < CHECK_INTERVAL:
+            return False
+        if not self.check_lock.acquire(blocking=False):
+            return False    #  Another request is checking.
+        try:
+            self.checked = now
+            blob_id = gitlab.get_blob_id()
+        except (requests.RequestException, ValueError) as e:
+            log.warn('Failed to check URL %s: %s' % (PROJECT_DATA_URL, e))
+            return False
+        finally:
+            self.check_lock.release()
+        return bool(blob_id) and blob_id != self.stamp
+
+    def _file_stamp(self):
+        #
+        #  Every save writes the data file, or the manifest of a sharded data
+        #  directory.
+        #
+        stamp = []
+        data_file = os.path.join(DATA_FILE, MANIFEST) if self.sharded else DATA_FILE
+        for path in (data_file, JOURNAL_FILE):
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _blob_id(self, js):
+        #
+        #  Git blob id of the content, as Gitlab reports it for the stored file.
+        #
+        buf = js.encode('utf-8')
+        return hashlib.sha1(b'blob %d\0' % len(buf) + buf).hexdigest()
 
 
 #
@@ -1265,15 +2246,20 @@ class Project:
     def __init__(self, repo):
         self.repo          = repo     # Project repo.
         self.name          = None     # Project name.
-        self.sprint_list   = []       # List of sprints in the project.
+        self.sprint_list   = SprintList(self)  # List of sprints in the project.
         self.issue_list    = []       # List of project issues.
         self.num_sprints   = 0
         self.active_sprint = None
         self.active_scrum  = None
         self.dev_names     = None     # Dictionary to translate developer login id to first name.
         self.dev_ids       = {}       # Dictionary to translate developer name to login id.
+        self.version       = repo.modified()  # Version stamp, time the store was last written.
+        self.changes       = []       # Change records since the last save, for the journal.
+        self.rewrite       = False    # Whether changes not in change records were made.
+        self.dirty         = False    # Whether anything changed since the last save.
+        self.gens          = {}       # Generations of its cached views, see view_generations().
         self._make_project()
-        self.save_project()
+        self.save_project()           # Only if the data needed normalizing.
 
     def _make_project(self):
         #
@@ -1282,6 +2268,7 @@ class Project:
         d = self.repo.data
         if 'name' in d and d['name'] and 'sprint_list' in d:
             self.name = d['name']
+            self.dirty = 'repo_url' not in d
         else:
             log.error("No history data found")
             sys.exit(1)
@@ -1292,11 +2279,19 @@ class Project:
                 name = self.get_dev_name(dev)
                 self.dev_ids[name.capitalize()] = dev
 
-        for sprint in d['sprint_list']:
-            self.sprint_list.append(Sprint(self, sprint))
-
+        self.sprint_list = SprintList(self, d['sprint_list'])
         self.num_sprints = len(self.sprint_list)
 
+        for i in range(self.num_sprints):
+            if 'dev_list' not in d['sprint_list'][i]:
+                self.sprint_list[i]    #  Older data, the sprint needs normalizing.
+
+        #
+        #  The sprint dicts are the sprint list's now.  The repo doesn't keep
+        #  them, so that the dicts of sprints made into objects can go.
+        #
+        self.repo.data = {}
+
         if self.num_sprints:
             if self.sprint_list[self.num_sprints - 1].active:
                 self.active_sprint = self.sprint_list[self.num_sprints - 1]
@@ -1387,48 +2382,80 @@ class Project:
         self.active_scrum  = sprint.scrum_list[1]
         self.sprint_list.append(sprint)
         self.num_sprints += 1
+        self.add_change('sprint_new', sprint, data=sprint.to_dict())
+
+    def copy(self, all_sprints=False):
+        #
+        #  Copy of the project for a writer to change and publish, while
+        #  requests already running keep reading this one unchanged.
+        #
+        #  Changes go to the last sprint, only that one is copied, the older
+        #  sprints are shared.  CLI edits may change any sprint, they copy all.
+        #
+        new = copy.copy(self)
+        new.changes     = []
+        memo = {id(self): new}    #  Copied sprints belong to the new project.
+        new.sprint_list = self.sprint_list.copy(new, memo, all_sprints)
+        new.active_sprint = memo.get(id(self.active_sprint), self.active_sprint)
+        new.active_scrum  = memo.get(id(self.active_scrum), self.active_scrum)
+        return new
 
     def save_project(self):
+        #
+        #  Save the project.  If all changes since the last save have change
+        #  records, the repo may just append them to its journal, otherwise
+        #  it gets the whole project.
+        #
+        #  Saves with nothing changed are skipped and counted.
+        #
+        if not self.dirty:
+            stats['skipped_saves'] += 1
+            return
+
+        if not (self.changes and not self.rewrite and self.repo.append(self.changes)):
+            changed = [sprint.number for sprint in self.sprint_list.loaded() if sprint.dirty]
+            self.repo.save(self.to_dict(), changed)
+        self.version = self.repo.modified()
+        stats['saves'] += 1
+        publish_version()
+
+        for sprint in self.sprint_list.loaded():
+            if sprint.dirty:
+                sprint.clean()
+        self.changes = []
+        self.rewrite = False
+        self.dirty   = False
+
+    def to_dict(self):
         d = {}
         d["name"]        = self.name
         d["repo_url"]    = self.repo.data_url
-        d["sprint_list"] = []
-
-        for sprint in self.sprint_list:
-            spr = {}
-            spr["sprint_number"] = sprint.number
-            spr["sprint_date"]   = sprint.date
-            spr["sprint_active"] = sprint.active
-
-            spr["sprint_task_list"] = []
-            for t in sprint.task_list:
-                ti = {}
-                ti["task_id"]  = t.task_id
-                ti["issue"]    = t.issue
-                ti["devel"]    = t.devel
-                ti["desc"]     = t.desc
-                ti["date"]     = t.date
-                spr["sprint_task_list"].append(ti)
-
-            spr["dev_list"] =  sprint.dev_list
-            spr["scrum_list"] = []
-            for s in sprint.scrum_list:
-                si = {}
-                si["scrum_number"]    = s.number
-                si["scrum_active"]    = s.active
-                si["scrum_task_list"] = []
-                for t in s.task_list:
-                    ti = {}
-                    ti["task_id"]  = t.task_id
-                    ti["progress"] = t.progress
-                    ti["blocker"]  = t.blocker
-                    ti["today"]    = t.today
-                    ti["date"]     = t.date
-                    si["scrum_task_list"].append(ti)
-                spr["scrum_list"].append(si)
-            d["sprint_list"].append(spr)
+        d["sprint_list"] = self.sprint_list.to_dicts()
+        return d
+
+    def add_change(self, op, sprint, scrum=None, **fields):
+        #
+        #  Record a change to a sprint, or to one of its scrums, for the journal,
+        #  see Data.append(), and mark them dirty.
+        #
+        change = {'op': op, 'sprint': sprint.number}
+        if scrum:
+            change['scrum'] = scrum.number
+            scrum.mark_dirty()
+        else:
+            sprint.mark_dirty()
+        change.update(fields)
+        self.changes.append(change)
 
-        self.repo.save(d)
+    def mark_rewrite(self, sprint=None):
+        #
+        #  Record a change without change record, the next save writes the
+        #  whole project.
+        #
+        self.rewrite = True
+        self.dirty   = True
+        if sprint:
+            sprint.mark_dirty()
 
     def update(self, request):
         #
@@ -1473,7 +2500,12 @@ class Project:
 
             progress, dontcare, blocker, today = self.active_sprint.get_task_details(task_id, self.active_sprint, self.active_scrum.number)
 
-            if t["progress"] != progress or t["today"] != today or t["blocker"] != blocker:
+            #
+            #  Progress comes as text from the form, compare it as a number, as
+            #  get_task_details() returns it, not to save unchanged tasks.
+            #
+            new_progress = int(t["progress"]) if str(t["progress"]).isdigit() else t["progress"]
+            if new_progress != progress or t["today"] != today or t["blocker"] != blocker:
                 #
                 #  This task changed, update it.
                 #
@@ -1487,11 +2519,13 @@ class Project:
                     tsk.today    = t["today"]
                     tsk.blocker  = t["blocker"]
                     tsk.date     = t["date"]
+                    self.active_sprint.index_task(task_id, self.active_scrum)
                 else:
                     #
                     #  Create new ScrumTask.
                     #
-                    self.active_scrum.add_task(t)   #  Add to scrum task_list.
+                    tsk = self.active_scrum.add_task(t)   #  Add to scrum task_list.
+                self.add_change('task_update', self.active_sprint, self.active_scrum, task=tsk.to_dict())
 
         if refresh:
             self.save_project()
@@ -1554,6 +2588,9 @@ class Project:
                         for scr in self.active_sprint.scrum_list:
                             scr.number = i
                             i += 1
+                        self.active_sprint.make_index()
+                        self.active_sprint.drop_views()
+                        self.mark_rewrite(self.active_sprint)
 
                 elif key == 'sprm':
                     #
@@ -1574,8 +2611,11 @@ class Project:
                     #
                     i = 1
                     for spr in self.sprint_list:
-                        spr.number = i
+                        if spr.number != i:
+                            spr.number = i
+                            spr.mark_dirty()
                         i += 1
+                    self.mark_rewrite()
 
                 elif key == 'scop':
                     #
@@ -1587,7 +2627,10 @@ class Project:
                             if num > 1:
                                 scr = self.active_sprint.scrum_list[num - 1]
                                 scr.active = True
+                                scr.view   = None
                                 self.active_scrum = scr
+                                self.mark_rewrite()
+                                scr.mark_dirty()
                                 changed = True
                 elif key == 'spop':
                     #
@@ -1598,6 +2641,7 @@ class Project:
                             spr = self.sprint_list[self.num_sprints - 1]
                             spr.active = True
                             self.active_sprint = spr
+                            self.mark_rewrite(spr)
                             changed = True
 
             return changed
@@ -1626,21 +2670,123 @@ class Project:
 
 
 #
-#  Container for all scrums in a sprint.
+#  The sprints of a project, used as a list.
 #
-class Sprint:
-    def __init__(self, project, sprint):
-        self.project    = project                  #  Project the sprint belongs to.
-        self.number     = sprint['sprint_number']
-        self.date       = sprint['sprint_date']
-        self.task_list  = []                       #  Sprint Task list.
-        self.scrum_list = []                       #  Scrums in the sprint.
-        self.active     = sprint['sprint_active']
-        self.dev_list   = []                       #  List of developers in this sprint.
+#  Most requests only look at the last sprint.  Sprints are kept as the dicts
+#  read from the data store, and made into Sprint objects when first used.
+#  Only SPRINT_CACHE_SIZE of them are kept as objects; the least recently
+#  used go back to dicts.  The last sprint, and sprints changed but not yet
+#  saved, stay objects.
+#
+class SprintList:
+    def __init__(self, project, sprints=()):
+        self.project = project
+        self.items   = list(sprints)  # Sprint objects, or dicts of sprints not made into objects.
+        self.lru     = OrderedDict()  # Sprint objects, least recently used first.
+        self.lock    = threading.Lock()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        with self.lock:
+            sprint = self.items[i]
+            if type(sprint) == dict:
+                sprint = Sprint(self.project, sprint)
+                self.items[i] = sprint
+            self.lru[sprint] = None
+            self.lru.move_to_end(sprint)
+            self._evict(sprint)
+            return sprint
+
+    def __iter__(self):
+        i = 0
+        while i < len(self.items):    #  As a list, sprints may be popped meanwhile.
+            yield self[i]
+            i += 1
+
+    def append(self, sprint):
+        with self.lock:
+            self.items.append(sprint)
+            self.lru[sprint] = None
+            self._evict(sprint)
+
+    def pop(self, i):
+        with self.lock:
+            sprint = self.items.pop(i)
+            if type(sprint) != dict:
+                self.lru.pop(sprint, None)
+            return sprint
+
+    def loaded(self):
+        #
+        #  Sprints made into objects.  Only these may have changed.
+        #
+        with self.lock:
+            return list(self.lru)
 
-        for task in sprint['sprint_task_list']:
-            tsk = SprintTask(self, task)
-            self.task_list.append(tsk)
+    def to_dicts(self):
+        with self.lock:
+            return [sprint if type(sprint) == dict else sprint.to_dict() for sprint in self.items]
+
+    def copy(self, project, memo, all_sprints=False):
+        #
+        #  Sprint list for a copy of the project, see Project.copy().  Sprint
+        #  objects are copied, the last one or all, or shared.  Dicts are never
+        #  changed, they are shared.
+        #
+        new = SprintList(project)
+        with self.lock:
+            last = len(self.items) - 1
+            for i, sprint in enumerate(self.items):
+                if type(sprint) != dict and (all_sprints or i == last):
+                    memo[id(sprint.project)] = project    #  Shared sprints may be of an older copy.
+                    sprint = copy.deepcopy(sprint, memo)
+                new.items.append(sprint)
+            for sprint in self.lru:
+                sprint = memo.get(id(sprint), sprint)
+                new.lru[sprint] = None
+        return new
+
+    def _evict(self, keep):
+        #
+        #  Never the sprint just handed out, the caller may be about to
+        #  change it.
+        #
+        while len(self.lru) > SPRINT_CACHE_SIZE:
+            for sprint in self.lru:
+                if not sprint.dirty and sprint is not self.items[-1] and sprint is not keep:
+                    break
+            else:
+                return      #  None can go.
+            del self.lru[sprint]
+            self.items[self.items.index(sprint)] = sprint.to_dict()
+
+
+#
+#  Container for all scrums in a sprint.
+#
+class Sprint:
+    __slots__ = ('project', 'number', 'date', 'task_list', 'task_map', 'issue_map', 'scrum_list',
+                 'active', 'dev_list', 'status', 'status_ids', 'dirty')
+
+    def __init__(self, project, sprint):
+        self.project    = project                  #  Project the sprint belongs to.
+        self.number     = sprint['sprint_number']
+        self.date       = sprint['sprint_date']
+        self.task_list  = []                       #  Sprint Task list.
+        self.task_map   = {}                       #  Sprint Tasks by task_id, in task_list order.
+        self.issue_map  = {}                       #  Sprint Tasks by issue number.
+        self.scrum_list = []                       #  Scrums in the sprint.
+        self.active     = sprint['sprint_active']
+        self.dev_list   = []                       #  List of developers in this sprint.
+        self.status     = {}                       #  Task status by (task_id, scrum number).
+        self.status_ids = set()                    #  Task ids with a status in any scrum.
+        self.dirty      = 'dev_list' not in sprint #  Changed since last saved.  Older data lack dev_list.
+
+        for task in sprint['sprint_task_list']:
+            tsk = SprintTask(task)
+            self.append_task(tsk)
 
         self.get_dev_list()
 
@@ -1648,32 +2794,93 @@ class Sprint:
             scr = Scrum(self, scrum)
             self.scrum_list.append(scr)
 
+        self.make_index()
+        if self.dirty:
+            project.dirty = True
+
     def get_issue(self, issue_id):
         #
-        #  Get issue data.
+        #  Get issue data, from the issue cache if fresh there.  Returns None if it can't.
         #
-        headers = {'user-agent':'Mozilla/5.0', 'PRIVATE-TOKEN':SPRINTVIEW_TOKEN}
-        payload = {'iid': issue_id}
-        r = requests.get(ISSUES_URL, headers=headers, params=payload)
+        cached = issue_cache.lookup(issue_id)
+        if cached and cached[2]:
+            return cached[0]
+
+        headers = None
+        if cached and cached[1]:
+            headers = {'If-None-Match': cached[1]}
+        try:
+            r = gitlab.get_issue(issue_id, headers)
+        except requests.RequestException as e:
+            log.error('Failed to open URL %s for issue %s: %s' % (ISSUES_URL, issue_id, e))
+            return None
+        if r.status_code == 304 and cached:
+            issue_cache.revalidated(issue_id)
+            return cached[0]
         if r.status_code != 200:
-            log.error('Failed to open URL %s: code %s' % (ISSUES_URL, r.status_code))
-            sys.exit(1)
-        l = json.loads(r.text)
-        return l[0]
+            log.error('Failed to open URL %s for issue %s: code %s' % (ISSUES_URL, issue_id, r.status_code))
+            return None
+        try:
+            l = json.loads(r.text)
+            if not l:
+                log.error('Issue %s not found' % issue_id)
+                return None
+            issue = l[0]
+            if 'iid' not in issue or 'title' not in issue:
+                raise KeyError('no iid or title')
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            #
+            #  A reply that isn't an issue list, e.g. a Gitlab error object.
+            #
+            log.error('Bad reply from URL %s for issue %s: %s: %s' % (ISSUES_URL, issue_id, type(e).__name__, e))
+            return None
+        issue_cache.store(issue_id, issue, r.headers.get('ETag'))
+        return issue
+
+    def get_issues(self, issue_ids):
+        #
+        #  Get the data of several issues, ISSUE_WORKERS at a time.
+        #
+        #  Returns a dictionary of issue data by issue id, None for issues
+        #  that failed.
+        #
+        issues = {}
+        if issue_ids:
+            with ThreadPoolExecutor(max_workers=ISSUE_WORKERS) as pool:
+                for issue_id, d in zip(issue_ids, pool.map(self.get_issue, issue_ids)):
+                    issues[issue_id] = d
+            issue_cache.save()
+        return issues
 
     def get_task(self, task_id):
         #
         #  Get a sprint task by id.
         #
-        for t in self.task_list:
-            if task_id == t.task_id:
-                return t
-        return False
+        return self.task_map.get(task_id, False)
 
     def task_exists(self, task_id):
-        if self.get_task(task_id):
-            return True
-        return False
+        return task_id in self.task_map
+
+    def append_task(self, tsk):
+        #
+        #  Add a sprint task to the task list and its lookup tables.
+        #
+        self.task_list.append(tsk)
+        self.task_map.setdefault(tsk.task_id, tsk)
+        self.issue_map.setdefault(tsk.issue, []).append(tsk)
+
+    def remove_task(self, task_id):
+        #
+        #  Remove a sprint task from the task list and its lookup tables.
+        #
+        tsk = self.task_map.pop(task_id, None)
+        if not tsk:
+            return False
+        self.task_list.remove(tsk)
+        self.issue_map[tsk.issue].remove(tsk)
+        if not self.issue_map[tsk.issue]:
+            del self.issue_map[tsk.issue]
+        return True
 
     def new_scrum(self):
         #
@@ -1686,22 +2893,23 @@ class Sprint:
         scr['scrum_task_list'] = []
         last_scrum = self.scrum_list[len(self.scrum_list) - 1]
         for task in self.project.active_sprint.task_list:
-            for tsk in last_scrum.task_list:
-                if tsk.task_id == task.task_id:
-                    if tsk.blocker or tsk.today:
-                        #
-                        #  Carry blockers and today's tasks forward.
-                        #
-                        t             = {}
-                        t["task_id"]  = task.task_id
-                        t['today']    = tsk.today
-                        t['progress'] = tsk.progress
-                        t['blocker']  = tsk.blocker
-                        t['date']     = time.time()
-                        scr['scrum_task_list'].append(t)
+            tsk = last_scrum.get_task(task.task_id)
+            if tsk and (tsk.blocker or tsk.today):
+                #
+                #  Carry blockers and today's tasks forward.
+                #
+                t             = {}
+                t["task_id"]  = task.task_id
+                t['today']    = tsk.today
+                t['progress'] = tsk.progress
+                t['blocker']  = tsk.blocker
+                t['date']     = time.time()
+                scr['scrum_task_list'].append(t)
 
         scrum = Scrum(self.project.active_sprint, scr)
         self.project.active_sprint.scrum_list.append(scrum)
+        self.project.active_sprint.index_scrum(scrum)
+        self.project.add_change('scrum_new', self.project.active_sprint, scrum, data=scrum.to_dict())
         self.project.active_scrum = scrum
 
     def get_dev_tasks(self, name):
@@ -1727,61 +2935,93 @@ class Sprint:
         #
         assert(self.active)
         self.active = False
+        self.project.add_change('sprint_close', self)
         if self.project.active_scrum:
             if self.project.active_scrum.active:
                 self.project.active_scrum.close()
-            self.project.active_sprint = None
+        self.project.active_sprint = None
+        #
+        #  Closed scrums without a view, closed before scrums kept them, get one now.
+        #
+        for scr in self.scrum_list:
+            if scr.number and not scr.active and scr.view is None:
+                scr.view = scr.make_view()
+                self.project.add_change('scrum_view', self, scr, view=scr.view_json())
 
-    def add_tasks(self, request):
+    def fetch_tasks(self, request):
         #
-        #  Add a new task to the current sprint.
-        #  request has the GET request reply from
-        #  Gitlab with the issue data.
+        #  Get from Gitlab the issue data of the tasks to add, see add_tasks().
+        #  request has the GET request with the task list.
         #
-        assert(self.project.active_sprint.active)
-        changed = False
+        #  All issues are fetched at once.  Returns a list of (assignee name
+        #  or None, issue number, issue data or None).
+        #
+        tasks = []
         if 'issue_list' in request and request['issue_list']:
             for task in request['issue_list'].split(','):
                 task = task.strip()
                 l = task.split(':')
                 if len(l) == 2:
-                    #
-                    #  The assignee is given.
-                    #
-                    num  = l[1]
-                    name = l[0]
-                    dev  = self.project.get_dev_id(name)
-                    task_id = dev + ':' + num
-                    d = self.get_issue(num)
+                    name, num = l[0].strip(), l[1].strip()
                 else:
-                    #
-                    #  Get assignee from Gitlab.
-                    #
-                    assert(task.isdigit())
-                    d = self.get_issue(task)
-                    if d['assignee'] and d['assignee']['username']:
-                        dev = d['assignee']['username']
-                    elif d['author'] and d['author']['username']:
-                        dev = d['author']['username']
-                    else:
-                        log.error('No developer assigned to task %s' % task)
-                        sys.exit(1)
-                    task_id = dev + ':' + task
-
-                if self.project.active_sprint.task_exists(task_id):
-                    log.warn('Task %s already exist' % task_id)
+                    name, num = None, task
+                if not num.isdigit():
+                    log.warn('Add tasks: skipping invalid task \'%s\'' % task)
                     continue
+                tasks.append((name, num))
 
-                ti            =  {}
-                ti["task_id"] = task_id
-                ti["issue"]   = d['iid']
-                ti["devel"]   = dev
-                ti["desc"]    = d['title']
-                ti["date"]    = time.time()
-                tsk = SprintTask(self, ti)
-                self.project.active_sprint.task_list.append(tsk)
-                self.project.active_sprint.get_dev_list()
-                changed = True
+        issues = self.get_issues(sorted(set([num for name, num in tasks])))
+        return [(name, num, issues[num]) for name, num in tasks]
+
+    def add_tasks(self, tasks):
+        #
+        #  Add new tasks to the current sprint.
+        #  tasks has the issue data from Gitlab, see fetch_tasks().
+        #
+        #  A task whose issue couldn't be fetched, or assigned, is reported
+        #  and skipped, the rest are added.
+        #
+        assert(self.project.active_sprint.active)
+        changed = False
+        for name, num, d in tasks:
+            if not d:
+                log.error('Add tasks: skipping task %s, no issue data' % num)
+                continue
+            if name:
+                #
+                #  The assignee is given.
+                #
+                dev  = self.project.get_dev_id(name)
+                task_id = dev + ':' + num
+            else:
+                #
+                #  Get assignee from Gitlab.
+                #
+                if d.get('assignee') and d['assignee'].get('username'):
+                    dev = d['assignee']['username']
+                elif d.get('author') and d['author'].get('username'):
+                    dev = d['author']['username']
+                else:
+                    log.error('No developer assigned to task %s' % num)
+                    continue
+                task_id = dev + ':' + num
+
+            if self.project.active_sprint.task_exists(task_id):
+                log.warn('Task %s already exist' % task_id)
+                continue
+
+            ti            =  {}
+            ti["task_id"] = task_id
+            ti["issue"]   = d['iid']
+            ti["devel"]   = dev
+            ti["desc"]    = d['title']
+            ti["date"]    = time.time()
+            tsk = SprintTask(ti)
+            self.project.active_sprint.append_task(tsk)
+            self.project.active_sprint.get_dev_list()
+            self.project.active_sprint.drop_views()
+            self.project.add_change('task_add', self, task=tsk.to_dict(), dev_list=self.project.active_sprint.dev_list)
+            changed = True
 
         if changed:
             self.project.save_project()
@@ -1819,91 +3059,210 @@ class Sprint:
             #
             num = task_id
             assert(num.isdigit())
-            for t in self.task_list:
-                if t.issue == int(num):
-                    dlist.append(t.task_id)
+            for t in self.issue_map.get(int(num), []):
+                dlist.append(t.task_id)
         for tid in dlist:
-            i = 0
-            for t in self.task_list:
-
-                if tid == t.task_id:
-                    dt = self.task_list.pop(i)
-                    changed = True
-                    break
-                i += 1
+            if self.remove_task(tid):
+                self.drop_views()
+                self.project.add_change('task_delete', self, task_id=tid)
+                changed = True
 
         return changed
 
+    def drop_views(self):
+        #
+        #  The task list changed, the views kept by the closed scrums are stale.
+        #
+        for scr in self.scrum_list:
+            scr.view = None
+
     def get_dev_list(self):
         devs = set()
         for task in self.task_list:
             devs.add(task.devel)
         self.dev_list = list(devs)
 
+    def mark_dirty(self):
+        self.dirty = True
+        self.project.dirty = True
+
+    def clean(self):
+        #
+        #  Saved, mark the sprint and its scrums clean.
+        #
+        self.dirty = False
+        for scr in self.scrum_list:
+            scr.dirty = False
+
+    def to_dict(self):
+        spr = {}
+        spr["sprint_number"] = self.number
+        spr["sprint_date"]   = self.date
+        spr["sprint_active"] = self.active
+
+        spr["sprint_task_list"] = []
+        for t in self.task_list:
+            spr["sprint_task_list"].append(t.to_dict())
+
+        spr["dev_list"] =  self.dev_list
+        spr["scrum_list"] = []
+        for s in self.scrum_list:
+            spr["scrum_list"].append(s.to_dict())
+        return spr
+
     def get_task_details(self, task_id, sprint, scrum_num):
         #
         #  Returns the current progress, previous progress,
         #  blocker, and today of a task for a given scrum.
         #
         assert (scrum_num > 0)
-        progress = 0
-        prev_progress = 0
-        blocker = ''
-        today = False
-        for scr in sprint.scrum_list:
-            for t in scr.task_list:
-                if t.task_id == task_id:
-                    if scr.number == scrum_num:
-                        progress = t.progress
-                        blocker  = t.blocker
-                        today    = t.today
-                    else:
-                        prev_progress = t.progress
-                    continue
-            if scr.number == scrum_num:
-                break
+        progress, prev_progress, blocker, today, latest = sprint.status.get((task_id, scrum_num), NO_STATUS)
 
         return (int(progress), int(prev_progress), blocker, today)
 
+    def make_index(self):
+        #
+        #  Index the status of every task in every scrum, by (task_id, scrum number).
+        #
+        self.status     = {}
+        self.status_ids = set()
+        for scr in self.scrum_list:
+            self.index_scrum(scr)
+
+    def index_scrum(self, scrum):
+        #
+        #  Index the status of the tasks in a scrum, carrying forward from
+        #  the scrum before it the latest progress of tasks not in this one.
+        #
+        #  Status entries are: (progress, previous progress, blocker, today, latest progress)
+        #
+        i = self.scrum_list.index(scrum)
+        prev_num = self.scrum_list[i - 1].number if i else None
+
+        self.status_ids.update(scrum.task_map)
+
+        for task_id in self.status_ids:
+            self._index_status(task_id, scrum, prev_num, scrum.get_task(task_id))
+
+    def index_task(self, task_id, scrum):
+        #
+        #  Re-index a task after a change to its ScrumTask in a scrum, and
+        #  carry the change forward to the scrums after it, if any.
+        #
+        self.status_ids.add(task_id)
+        i = self.scrum_list.index(scrum)
+        for scr in self.scrum_list[i:]:
+            prev_num = self.scrum_list[i - 1].number if i else None
+            self._index_status(task_id, scr, prev_num, scr.get_task(task_id))
+            i += 1
+
+    def _index_status(self, task_id, scrum, prev_num, tsk):
+        #
+        #  Set the status entry of a task in a scrum from its ScrumTask, if any.
+        #
+        if prev_num is None:
+            prev_progress = 0
+        else:
+            prev_progress = self.status.get((task_id, prev_num), NO_STATUS)[4]
+
+        if tsk:
+            entry = (tsk.progress, prev_progress, tsk.blocker, tsk.today, tsk.progress)
+        else:
+            entry = (0, prev_progress, '', False, prev_progress)
+        self.status[(task_id, scrum.number)] = entry
+
 
 #
 #  Container for all developers' reports in a scrum.
 #
 class Scrum:
+    __slots__ = ('sprint', 'task_list', 'task_map', 'dirty', 'active', 'number', 'view')
+
     def __init__(self, sprint, scrum):
         self.sprint    = sprint    #  Sprint object.
         self.task_list = []        #  Scrum task list.
+        self.task_map  = {}        #  Scrum tasks by task_id.
+        self.dirty     = False     #  Changed since last saved.
         self.active = scrum['scrum_active']
         self.number = scrum['scrum_number']
+        self.view   = scrum.get('scrum_view')   #  Task status, once closed, see make_view().
+        if isinstance(self.view, str):
+            self.view = json.loads(self.view)
 
         for tsk in scrum['scrum_task_list']:
-            task = ScrumTask(self, tsk)
+            task = ScrumTask(tsk)
             self.task_list.append(task)
+            self.task_map.setdefault(task.task_id, task)
 
     def get_task(self, task_id):
-        for t in self.task_list:
-            if task_id == t.task_id:
-                return t
-        return False
+        return self.task_map.get(task_id, False)
 
     def add_task(self, tsk):
-        task = ScrumTask(self, tsk)
+        task = ScrumTask(tsk)
         self.task_list.append(task)
+        self.task_map.setdefault(task.task_id, task)
+        self.sprint.index_task(task.task_id, self)
+        return task
 
     def close(self):
         assert (self.active)
         self.active = False
+        self.view   = self.make_view()
         self.sprint.project.active_scrum = None
+        self.sprint.project.add_change('scrum_close', self.sprint, self, view=self.view_json())
+
+    def make_view(self):
+        #
+        #  The status of each sprint task in this scrum, in task order:
+        #
+        #      [progress, previous progress, blocker, today]
+        #
+        #  A closed scrum keeps it, and it's saved with the scrum, so views of
+        #  past scrums are never worked out again.  Changes to the sprint task
+        #  list drop it, see Sprint.drop_views().
+        #
+        sprint = self.sprint
+        return [list(sprint.get_task_details(t.task_id, sprint, self.number)) for t in sprint.task_list]
+
+    def view_json(self):
+        #
+        #  The view as saved: compact json text, one line in the data file.
+        #
+        return json.dumps(self.view, separators=(',', ':'))
+
+    def get_view(self):
+        if self.view is not None and len(self.view) == len(self.sprint.task_list):
+            return self.view
+        return self.make_view()
+
+    def mark_dirty(self):
+        self.dirty = True
+        self.sprint.mark_dirty()
+
+    def to_dict(self):
+        si = {}
+        si["scrum_number"]    = self.number
+        si["scrum_active"]    = self.active
+        si["scrum_task_list"] = []
+        for t in self.task_list:
+            si["scrum_task_list"].append(t.to_dict())
+        if self.view is not None:
+            si["scrum_view"]  = self.view_json()
+        return si
 
 #
 #  Container for a sprint task.
 #
+#  Model objects have slots, no __dict__, there are many of them.  Task ids
+#  and developers repeat, they are interned.
+#
 class SprintTask:
-    def __init__(self, sprint, task):
-        self.sprint   = sprint
+    __slots__ = ('task_id', 'devel', 'issue', 'desc', 'date')
+
+    def __init__(self, task):
         if type(task) == dict:
-            self.task_id  = task['task_id']
-            self.devel    = task['devel']
+            self.task_id  = sys.intern(task['task_id'])
+            self.devel    = sys.intern(task['devel'])
             self.issue    = task['issue']
             self.desc     = task['desc']
             self.date     = task['date']      # Datetime of creation or latest update.
@@ -1914,44 +3273,164 @@ class SprintTask:
             self.desc     = task.desc
             self.date     = task.date      # Datetime of creation or latest update.
 
-    def make_issue_link(self):
-        return('<a href="%s/%s" target="blank">%s</a>' % (SINGLE_ISSUE_URL, self.issue, self.issue))
+    def to_dict(self):
+        ti = {}
+        ti["task_id"]  = self.task_id
+        ti["issue"]    = self.issue
+        ti["devel"]    = self.devel
+        ti["desc"]     = self.desc
+        ti["date"]     = self.date
+        return ti
 
 
 #
 #  Container for the scrum task progress report.
 #
 class ScrumTask:
-    def __init__(self, scrum, task):
-        self.scrum    = scrum
-        self.task_id  = task['task_id']
+    __slots__ = ('task_id', 'progress', 'blocker', 'today', 'date')
+
+    def __init__(self, task):
+        self.task_id  = sys.intern(task['task_id'])
         self.progress = task['progress']
         self.blocker  = task['blocker']
         self.today    = task['today']    # Boolean, true if task is today's work.
         self.date     = task['date']     # Datetime of submission.
 
+    def to_dict(self):
+        ti = {}
+        ti["task_id"]  = self.task_id
+        ti["progress"] = self.progress
+        ti["blocker"]  = self.blocker
+        ti["today"]    = self.today
+        ti["date"]     = self.date
+        return ti
+
 
 #
-#  Cache view - To cache views already generated.
+#  One cached view per scrum, whatever its sort: the task rows in task order,
+#  and the rows sorted on each column asked for so far.
 #
 class CacheView:
-    def __init__(self, sprint_num, scrum_num, sort_column, sort_order, task_list, blocker_list):
+    def __init__(self, sprint_num, scrum_num, task_list, blocker_list):
         self.sprint_num   = sprint_num
-        self.scrum_num    = scrum_num,
-        self.sort_column  = sort_column
-        self.sort_order   = sort_order
+        self.scrum_num    = scrum_num
         self.task_list    = task_list
         self.blocker_list = blocker_list
+        self.sorted       = {}    #  Sort column -> rows in ascending order.
 
-    def same_sort_column(self, view):
-        if view.sort_column == self.sort_column:
+    def is_sorted(self, sort_column):
+        if sort_column in self.sorted or sort_column not in SORT_KEYS:
             return True
         return False
 
-    def same_sort_order(self, view):
-        if view.sort_order == self.sort_order:
-            return True
-        return False
+    def sort(self, sort_column):
+        self.sorted[sort_column] = sorted(self.task_list, key=SORT_KEYS[sort_column])
+
+    def get_sorted(self, sort_column, sort_order):
+        #
+        #  Each column is sorted once, ascending.  The descending order is
+        #  the ascending one walked backwards.
+        #
+        rows = self.sorted.get(sort_column, self.task_list)
+        if sort_order == 'descending':
+            return rows[::-1]
+        return rows
+
+#
+#  A row of the task table of a view: a sprint task and its status in a scrum.
+#
+#  Rows are plain values, sorted on them, see View.get_view().  They only
+#  become HTML when the page is rendered, see html() and blocker_html().
+#
+class TaskRow:
+    __slots__ = ('dev', 'issue', 'desc', 'progress', 'prev_progress', 'blocker', 'today', 'total')
+
+    def __init__(self, dev, issue, desc, progress, prev_progress, blocker, today):
+        self.dev           = dev             #  Developer name, as shown.
+        self.issue         = issue           #  Issue number.
+        self.desc          = desc
+        self.progress      = progress        #  Progress in the scrum, 0 if no update.
+        self.prev_progress = prev_progress   #  Progress before the scrum.
+        self.blocker       = blocker
+        self.today         = today           #  True if today's work.
+        self.total         = progress or prev_progress   #  Progress shown in brackets, the status sort key.
+
+    def issue_link(self):
+        return('<a href="%s/%s" target="blank">%s</a>' % (SINGLE_ISSUE_URL, self.issue, self.issue))
+
+    def html(self):
+        #
+        #  The row as the task table shows it: developer, issue link,
+        #  description and colored progress bar.
+        #
+        progress      = self.progress
+        prev_progress = self.prev_progress
+
+        if self.today:
+            desc = td + self.desc[:90] + em  #  Highlights today's tasks.
+        else:
+            desc = self.desc[:90]
+
+        if not progress and not prev_progress:
+            #
+            #  There is no progress for this feature so far.
+            #
+            p = da + '[0]' + em
+            if self.blocker:
+                p += r + 'Blocked' + em
+            return (self.dev, self.issue_link(), desc, p)
+
+        #
+        #  Add the progress for this feature so far.
+        #  And color the status strings.
+        #
+        prev_progress_str = ''
+        gain_str          = ''
+        gain              = 0
+
+        if progress:
+            gain = progress - prev_progress
+            if gain:
+                gain_str      = str(gain)
+                gain_str_len  = len(gain_str)
+            if gain < 0:
+                prev_progress = progress
+                gain_str = og + '&lt;' + ('-' * (int(abs(gain) / 2) - gain_str_len - 1) + gain_str) + '&nbsp;' + em
+            elif gain > 0:
+                total_str = da + '[' +  str(progress) + ']' + em
+                gain_str  = li + (('&nbsp;' * (int(gain / 2) - gain_str_len)) + gain_str) + em + total_str
+
+        if prev_progress:
+            prev_progress_str     = str(prev_progress)
+            prev_progress_str_len = len(prev_progress_str)
+            if gain > 0:
+                prev_progress_str = me + ('&nbsp;' * (int(prev_progress / 2) - prev_progress_str_len) + prev_progress_str) + em
+            else:
+                total_str = da + '[' +  str(prev_progress) + ']' + em
+                prev_progress_str = me +  ('&nbsp;' * (int(prev_progress / 2) - prev_progress_str_len)  + prev_progress_str) + em + total_str
+
+        p = prev_progress_str + gain_str
+
+        if not p:
+            p = da + '[0]' + em
+
+        if self.blocker:
+            p = p + r + 'Blocked' + em
+
+        return (self.dev, self.issue_link(), desc, p)
+
+    def blocker_html(self):
+        return dr + self.dev + ': ' + self.issue_link() + ': ' + self.desc + ': ' + self.blocker + em
+
+#
+#  Sort keys of the task table columns.
+#
+SORT_KEYS = {
+    'dev_sort':    lambda row: row.dev,
+    'issue_sort':  lambda row: row.issue,
+    'desc_sort':   lambda row: row.desc,
+    'status_sort': lambda row: row.total,
+}
 
 #
 #  Display data container.
@@ -1996,8 +3475,42 @@ class View:
             self.cur_scrum_num  = 0
             self.cur_scrum      = None
 
+    def _make_view_tag(self):
+        gens = self.project.gens
+        keys = ['gen', 'gen:%d' % self.cur_sprint_num, 'gen:%d:%d' % (self.cur_sprint_num, self.cur_scrum_num)]
+        gen  = '.'.join([gens.get(key, '0') for key in keys])
+        return gen + ':' + str(self.cur_sprint_num) + ':' + str(self.cur_scrum_num)
+
     def _make_cache_tag(self):
-        return str(self.cur_sprint_num) + ':' + str(self.cur_scrum_num) + ':' + self.sort_column + ':' + self.sort_order
+        return self._make_view_tag() + ':' + self.sort_column + ':' + self.sort_order
+
+    def make_page_tag(self, page_vars):
+        #
+        #  Cache key of the rendered page, the view plus the page parts that
+        #  come from the project as a whole: flags, dev list, etc.
+        #
+        digest = hashlib.md5(repr(page_vars).encode('utf-8')).hexdigest()
+        return 'page:' + self._make_cache_tag() + ':' + digest
+
+    def make_etag(self):
+        #
+        #  Entity tag of the page for this view, at the current project version.
+        #
+        tag = repr((self.project.version, self.cur_sprint_num, self.cur_scrum_num,
+                    self.sort_column, self.sort_order, STATIC_CSS, time.strftime('%Y')))
+        return quote_etag(hashlib.md5(tag.encode('utf-8')).hexdigest())
+
+    def get_expiration(self):
+        #
+        #  Views of closed sprints, and of closed scrums, stay cached, nothing
+        #  changes them without invalidating them.  Views of the active sprint
+        #  expire as usual.
+        #
+        if self.cur_scrum and self.cur_scrum.view is not None:
+            return None
+        if self.cur_sprint and self.cur_sprint.active:
+            return VIEW_EXPIRATION
+        return None
 
     def get_view(self):
         #
@@ -2012,129 +3525,49 @@ class View:
         sprint = self.cur_sprint
         scrum  = self.cur_scrum
 
-        prev_view = cache.get(self._make_cache_tag())
+        view_tag  = self._make_view_tag()
+        prev_view = cache.get(view_tag)
 
         if not prev_view:
             #
             # Generate the view for the first time.
             #
-            task_list   = []
+            task_list    = []
             blocker_list = []
 
-            for t in sprint.task_list:
-                #
-                #   For each sprint task:
-                #
-                #      Check from Scrum 0 to the requested scrum for
-                #      progress, blockers, and today status.  And process
-                #      text for display.
-                #
-                gain          = 0
-                progress      = 0
-                prev_progress = 0
-                blocker       = ''
-
-                progress, prev_progress, blocker, today = sprint.get_task_details(t.task_id, sprint, scrum_num)
-
-                if blocker:
-                    name = proj.get_dev_name(t.devel)
-                    blk = name[:10] + ': ' + t.make_issue_link() + ': ' + t.desc + ': ' + blocker
-                    blocker_list.append(blk)
-
-                if not progress and not prev_progress:
-                    #
-                    #  There are no ScrumTasks for this task.
-                    #
-                    p = da + '[0]' + em
-                    if blocker:
-                        p += r + 'Blocked' + em
-
-                    #
-                    #  There is no progress for this feature so far.
-                    #
-                    if today:
-                        desc = td + t.desc[:90] + em
-                    else:
-                        desc = t.desc[:90]
-
-                    name = proj.get_dev_name(t.devel)
-                    task_list.append((name[:10], t.make_issue_link(), desc, p))
-                    continue
-
+            for t, status in zip(sprint.task_list, scrum.get_view()):
                 #
-                #  Add the progress for this feature so far.
-                #  And color the status strings.
+                #   For each sprint task, its progress, blocker and today
+                #   status in the requested scrum.
                 #
-                prev_progress_str = ''
-                gain_str          = ''
-
-                if progress:
-                    gain = progress - prev_progress
-                    if gain:
-                        gain_str      = str(gain)
-                        gain_str_len  = len(gain_str)
-                    if gain < 0:
-                        prev_progress = progress
-                        gain_str = og + '&lt;' + ('-' * ((abs(gain) / 2) - gain_str_len - 1) + gain_str) + '&nbsp;' + em
-                    elif gain > 0:
-                        total_str = da + '[' +  str(progress) + ']' + em
-                        gain_str  = li + (('&nbsp;' * (int(gain / 2) - gain_str_len)) + gain_str) + em + total_str
-
-                if prev_progress:
-                    prev_progress_str     = str(prev_progress)
-                    prev_progress_str_len = len(prev_progress_str)
-                    if gain > 0:
-                        prev_progress_str = me + ('&nbsp;' * (int(prev_progress / 2) - prev_progress_str_len) + prev_progress_str) + em
-                    else:
-                        total_str = da + '[' +  str(prev_progress) + ']' + em
-                        prev_progress_str = me +  ('&nbsp;' * (int(prev_progress / 2) - prev_progress_str_len)  + prev_progress_str) + em + total_str
-
-                p = prev_progress_str + gain_str
-
-                if not p:
-                    p = da + '[0]' + em
+                progress, prev_progress, blocker, today = status
 
+                name = self.project.get_dev_name(t.devel)
+                row  = TaskRow(name[:10], t.issue, t.desc, progress, prev_progress, blocker, today)
+                task_list.append(row)
                 if blocker:
-                    p = p + r + 'Blocked' + em
-
-                if today:
-                    desc = td + t.desc[:90] + em  #  Highlights today's tasks.
-                else:
-                    desc = t.desc[:90]
+                    blocker_list.append(row)
 
-                name = proj.get_dev_name(t.devel)
-                task_list.append((name[:10], t.make_issue_link(), desc, p))
-            #
-            #  Color the blockers.
-            #
-            blocker_list = [ dr + blk + em for blk in blocker_list]
+            prev_view = CacheView(sprint_num, scrum_num, task_list, blocker_list)
+            new_view  = True
         else:
-            #
-            #  View in cache, retrieve task and blocker lists.
-            #
-            task_list = prev_view.task_list
-            blocker_list = prev_view.blocker_list
+            new_view  = False
 
-        if not prev_view:
+        if not prev_view.is_sorted(self.sort_column):
             #
-            #  Sort task list by sort column and sort order.
+            #  First time this column is asked for: sort and keep it.
             #
-            reverse_sort = True if self.sort_order == "descending" else False
-
-            if self.sort_column == 'dev_sort':
-                task_list.sort(key=lambda tup: tup[0], reverse=reverse_sort)
-            elif self.sort_column == 'issue_sort':
-                task_list.sort(key=lambda tup: tup[1], reverse=reverse_sort)
-            elif self.sort_column == 'desc_sort':
-                task_list.sort(key=lambda tup: tup[2], reverse=reverse_sort)
-            elif self.sort_column == 'status_sort':
-                task_list.sort(key=lambda tup: int(tup[3].split('[')[1].split(']')[0]), reverse=reverse_sort)
+            prev_view.sort(self.sort_column)
+            new_view = True
 
+        if new_view:
             #
             #  Cache this view.
             #
-            prev_view = CacheView(self.cur_sprint_num, self.cur_scrum_num, self.sort_column, self.sort_order, task_list, blocker_list)
-            cache.set(self._make_cache_tag(), prev_view, VIEW_EXPIRATION)
+            cache.set(view_tag, prev_view, self.get_expiration())
+
+        task_list    = prev_view.get_sorted(self.sort_column, self.sort_order)
+        blocker_list = prev_view.blocker_list
 
         return ((task_list, blocker_list, self.sort_column, self.sort_order))
 
@@ -2176,6 +3609,8 @@ class View:
         self.cur_scrum = self.cur_sprint.scrum_list[self.cur_scrum_num]
 
     def set_sort_column(self, sort_column):
+        if sort_column not in SORT_COLUMNS:
+            return
         if sort_column == self.sort_column:
             self.sort_order = 'descending' if self.sort_order == 'ascending' else 'ascending'
         else:
@@ -2185,6 +3620,46 @@ class View:
     def set_last(self):
         self._init_view()
 
+    def set_state(self, state):
+        #
+        #  Move the view to a state returned by get_state(), as kept in the
+        #  browser cookie.  Parts out of range, e.g. of a sprint that no
+        #  longer exists, are ignored and left at their defaults.
+        #
+        field = state.split(':')
+        if len(field) != 4:
+            return
+        sprint_num, scrum_num, sort_column, sort_order = field
+        if sort_column in SORT_COLUMNS and sort_order in SORT_ORDERS:
+            self.sort_column = sort_column
+            self.sort_order  = sort_order
+        if not (sprint_num.isdigit() and scrum_num.isdigit()):
+            return          #  Follows the latest sprint and scrum.
+        sprint_num = int(sprint_num)
+        scrum_num  = int(scrum_num)
+        if sprint_num < 1 or sprint_num > self.num_sprints:
+            return
+        sprint = self.project.sprint_list[sprint_num - 1]
+        if scrum_num < 1 or scrum_num > len(sprint.scrum_list) - 1:
+            return
+        self.cur_sprint_num = sprint_num
+        self.cur_sprint     = sprint
+        self.num_scrums     = len(sprint.scrum_list) - 1
+        self.cur_scrum_num  = scrum_num
+        self.cur_scrum      = sprint.scrum_list[scrum_num]
+
+    def get_state(self):
+        #
+        #  The view as a string 'sprint:scrum:sort column:sort order'.  A view
+        #  of the latest scrum leaves sprint and scrum empty, so it moves on
+        #  to new scrums and sprints when they are created.
+        #
+        if self.cur_sprint_num == self.num_sprints and self.cur_scrum_num == self.num_scrums:
+            position = ':'
+        else:
+            position = '%d:%d' % (self.cur_sprint_num, self.cur_scrum_num)
+        return '%s:%s:%s' % (position, self.sort_column, self.sort_order)
+
     def get_num_sprints(self):
         return(self.num_sprints)
 
@@ -2221,6 +3696,8 @@ class View:
 
 def init():
     global log
+    global gitlab
+    global issue_cache
 
     if not os.access(LOGGING_DIR, os.W_OK):
         log.error('Can\'t write to logging dir: %s' % LOGGING_DIR)
@@ -2232,30 +3709,279 @@ def init():
     log = logging.getLogger('sprintview_log')
     log.info('Sprint View Starting.  Project file: %s' % PROJECT_DATA)
 
+    gitlab      = Gitlab()
+    issue_cache = IssueCache()
+
+    get_template('page')
+    get_template('update_page')
+
+
+def startup():
+    #
+    #  Initialize and load the project, once, on start, see warm_up(), or
+    #  else on the first request.
+    #
+    global inited
+
+    with write_lock:
+        if inited == False:
+            init()
+            load()
+            inited = True
+
+
+def warm_up():
+    #
+    #  Load the project and render the board of the latest sprint and scrum
+    #  before the server takes requests, so that the first user doesn't wait.
+    #
+    #  The views next to it are rendered here too, not by the prewarm thread:
+    #  a prefork server forks its workers after warm_up(), and a fork while
+    #  the thread is rendering would leave the locks it holds held for good
+    #  in the workers.
+    #
+    start = time.time()
+    startup()
+    view = View(proj)
+    render_board(view)
+    if PREWARM and proj.num_sprints:
+        render_neighbours(proj, view.get_state())
+    stats['startup_seconds'] = round(time.time() - start, 3)
+    log.info('Sprint View ready in %.2f seconds.' % stats['startup_seconds'])
+
+
+def prewarm(project, state):
+    #
+    #  Queue the views a click away from a view, previous and next scrum and
+    #  sprint in the same sort, and the latest, to be rendered into the cache
+    #  by a background thread.  Returns at once, responses don't wait for it.
+    #
+    #  A prefork server may fork its workers after the pool was made, and a
+    #  forked process doesn't have the pool's thread.  So each process makes
+    #  its own, and drops what the parent had queued.
+    #
+    global prewarm_pool
+    global prewarm_pid
+
+    if not PREWARM or not project.num_sprints:
+        return
+    if prewarm_pid != os.getpid():
+        prewarm_pool = ThreadPoolExecutor(max_workers=1)
+        prewarm_pid  = os.getpid()
+        prewarm_todo.clear()
+    key = (project.version, state)
+    if key in prewarm_todo:
+        return
+    prewarm_todo.add(key)
+    prewarm_pool.submit(_prewarm, project, state, key)
+
+
+def _prewarm(project, state, key):
+    try:
+        render_neighbours(project, state)
+    except Exception as e:
+        log.warn('Prewarm: views next to %s failed: %s' % (state, e))
+    finally:
+        prewarm_todo.discard(key)
+
+
+def render_neighbours(project, state):
+    #
+    #  Render into the cache the views a click away from a view.
+    #
+    for move in ('set_prev_scrum', 'set_next_scrum', 'set_prev_sprint', 'set_next_sprint', 'set_last'):
+        if project is not proj:
+            break       #  Changed meanwhile, its views are stale.
+        view = View(project)
+        view.set_state(state)
+        getattr(view, move)()
+        render_board(view)
+        stats['prewarmed'] += 1
+
+
+def shard_data():
+    #
+    #  Convert the data file into a sharded data directory, see Data.  The
+    #  data file is kept as <data file>.single.
+    #
+    if not os.path.isfile(DATA_FILE):
+        log.error('No data file to shard: %s' % DATA_FILE)
+        sys.exit(1)
+
+    data = Data()
+    tmp  = DATA_FILE + '.shards'
+    if os.path.isdir(tmp):
+        shutil.rmtree(tmp)      #  Left by a failed run.
+    os.mkdir(tmp)
+    data.write_shards(data.data, None, tmp)
+    os.replace(DATA_FILE, DATA_FILE + '.single')
+    os.replace(tmp, DATA_FILE)
+    if JOURNAL and os.access(JOURNAL_FILE, os.F_OK):
+        with open(JOURNAL_FILE, 'w') as f:
+            pass                #  Replayed, its changes are in the shards.
+    log.info('Data file %s sharded, %d sprints.' % (DATA_FILE, len(data.data['sprint_list'])))
+
+
+def import_data(path):
+    #
+    #  Load a json data file into the SQLite database, replacing what it had.
+    #
+    if not DATA_FILE.endswith(DB_SUFFIXES):
+        log.error('Data file %s is not a database, name it *.db, *.sqlite or *.sqlite3.' % DATA_FILE)
+        sys.exit(1)
+    with open(path) as f:
+        proj, size = load_json(f)
+    Database(DATA_FILE).write(proj)
+    log.info('Data file %s imported into %s, %d sprints.' % (path, DATA_FILE, len(proj['sprint_list'])))
+
+
+def export_data(path):
+    #
+    #  Write the project data, of any kind of data store, to a json data file.
+    #
+    data = Data()
+    with open(path, 'w') as f:
+        f.write(json.dumps(data.data, indent=4) + '\n')
+    log.info('Data store exported to %s, %d sprints.' % (path, len(data.data['sprint_list'])))
+
+
+def get_template(name):
+    #
+    #  Returns a compiled page template.  Templates are compiled once, on
+    #  first use, and reused by every request after that.
+    #
+    t = templates.get(name)
+    if not t:
+        if name == 'page':
+            if STATIC_CSS:
+                css = '<link rel="stylesheet" href="/sprintview.css?v=%s">' % CSS_VERSION
+            else:
+                css = '<style>' + page_css + '</style>'
+            t = Template(page.replace('<!-- page_css -->', css))
+        else:
+            t = Template(update_page)
+        templates[name] = t
+    return t
+
+
+def view_generations():
+    #
+    #  Returns the generations of the cached views, of the project, 'gen', of
+    #  the sprints, 'gen:<sprint>', and of the scrums, 'gen:<sprint>:<scrum>'.
+    #
+    #  Cached views have the generation of their project, sprint, and scrum in
+    #  their cache keys, see View._make_view_tag().  Each project snapshot
+    #  keeps the generations it was published with, so that a request or the
+    #  prewarm thread still reading an older snapshot can't cache its views
+    #  under the keys of a newer one.
+    #
+    #  Sprints and scrums never invalidated are at '0'.  Missing, never set or
+    #  evicted, they all get a fresh project generation, so that they can't
+    #  match any older view.
+    #
+    gens = cache.get('gens')
+    if gens is None:
+        cache.add('gens', {'gen': '%x' % time.time_ns()}, None)
+        gens = cache.get('gens')
+    return gens
+
+
+def invalidate_views(project, sprint_num=None, scrum_num=None):
+    #
+    #  Make the cached views of a scrum, of a whole sprint, or of the whole
+    #  project unreachable, by giving them a new generation.  Writers call it
+    #  under write_lock, on the project they just published.
+    #
+    gen = '%x' % time.time_ns()
+    if sprint_num is None:
+        gens = {'gen': gen}
+    else:
+        gens = dict(project.gens)
+        if scrum_num is None:
+            gens['gen:%d' % sprint_num] = gen
+        else:
+            gens['gen:%d:%d' % (sprint_num, scrum_num)] = gen
+    project.gens = gens
+    cache.set('gens', gens, None)
+
+
+def publish_version():
+    #
+    #  Tell the other worker processes, through the shared cache, that we
+    #  saved a new version of the data store, see sync().
+    #
+    global data_version
+
+    data_version = '%d:%x' % (os.getpid(), time.time_ns())
+    cache.set('data_version', data_version, None)
+
+
+def sync():
+    #
+    #  Reload the project if another worker process saved a newer version
+    #  of the data store.  Writers call it under write_lock before changing
+    #  the project, not to overwrite the other worker's changes.
+    #
+    if cache.get('data_version') != data_version:
+        log.info('Data store saved by another worker, reloading.')
+        load(invalidate=False)   #  The worker invalidated the views it changed.
+
+
+def load(invalidate=True):
+    #
+    #  Read the whole data store and rebuild the project.
+    #
+    #  Only needed on start, on RELOAD, and when the store changed outside
+    #  this process.  Our own writes are applied to the live project.
+    #
+    global proj
+    global data_version
+
+    data_version = cache.get('data_version')   #  Before reading, a save meanwhile reloads again.
+    gens = view_generations()   #  Before reading too, not to cache old data under newer keys.
+    data = Data()               #  Get Repo data as a dictionary.
+    new  = Project(data)        #  Process and store repo data.
+    new.gens = gens
+    proj = new                  #  Global.
+    if invalidate:
+        invalidate_views(proj)  #  Cached views may be of the old data.
+
 
 def index(request):
     #
     #  All URLs come here.
     #
+    #  Each browser keeps its own view, sprint, scrum and sort, in a cookie,
+    #  so that moving around the board only moves the board of that browser.
+    #
+    #  Requests read the project as it was when they started, a snapshot never
+    #  changed in place.  Writers, one at a time under write_lock, change a
+    #  copy of it, save it, and publish it as the new proj.
+    #
     global proj
-    global view
-    global inited
 
-    re_load = False
+    refresh = False    #  Whether the project changed and views are stale.
 
     if request.method == "GET":
 
         param = request.path.split('/')[1]
 
         if inited == False:
-            #
-            #  First request.
-            #
-            init()
-            data   = Data()               #  Get Repo data as a dictionary.
-            proj   = Project(data)        #  Global. Process and store repo data.
-            view   = View(proj)           #  Global. Initialize first page to view.
-            inited = True
+            startup()       #  First request, not warmed up.
+        elif cache.get('data_version') != data_version:
+            with write_lock:
+                sync()
+        elif proj.repo.changed():
+            seen = proj
+            with write_lock:
+                if proj is seen:    #  Not reloaded by another request meanwhile.
+                    log.info('Data store changed outside Sprint View, reloading.')
+                    load()
+
+        project = proj     #  Snapshot this request reads.
+
+        view = View(project)
+        view.set_state(request.COOKIES.get(VIEW_COOKIE, ''))
 
         if request.path == '/':
             pass    #  First request and Go back buttons
@@ -2276,13 +4002,29 @@ def index(request):
             sort_column = param
             view.set_sort_column(sort_column)
         elif request.path == '/reload':
-            re_load = True
+            with write_lock:
+                load()
+            project = proj
+            view = View(project)
+            view.set_state(request.COOKIES.get(VIEW_COOKIE, ''))
+        elif request.path == '/stats':
+            return HttpResponse(json.dumps(stats, indent=4), content_type='application/json')
+        elif request.path == '/sprintview.css':
+            response = HttpResponse(page_css, content_type='text/css')
+            response['Cache-Control'] = 'public, max-age=%d' % CSS_EXPIRATION
+            return response
         elif request.path == '/update':
-            re_load = proj.update(request)
+            with write_lock:
+                sync()
+                new = proj.copy()
+                refresh = new.update(request)
+                if refresh:
+                    proj = new
+                    invalidate_views(proj, proj.active_sprint.number, proj.active_scrum.number)
         elif request.path.startswith('/devel_'):
-            assert proj.active_sprint
+            assert project.active_sprint
             dev  = param.split('_')[1]
-            task_list = proj.active_sprint.get_dev_tasks(dev)
+            task_list = project.active_sprint.get_dev_tasks(dev)
             l = len(task_list)
             #  Distance between developers tasks on the update board.
             if l == 2:
@@ -2295,59 +4037,117 @@ def index(request):
                 interfield = 5
             else:
                 interfield = 0
-            name = proj.get_dev_name(dev)
-            t = Template(update_page)
-            c = Context({'task_list': task_list, 'dev': name, 'scrum_num': proj.active_scrum.number, 'interfield': interfield})
+            name = project.get_dev_name(dev)
+            t = get_template('update_page')
+            c = Context({'task_list': task_list, 'dev': name, 'scrum_num': project.active_scrum.number, 'interfield': interfield})
             return  HttpResponse(t.render(c))
         elif request.path == '/close_scrum':
-            if proj.active_scrum:
-                proj.active_scrum.close()
-                proj.save_project()
-                re_load = True
+            with write_lock:
+                sync()
+                if proj.active_scrum:
+                    new = proj.copy()
+                    sprint_num, scrum_num = new.active_sprint.number, new.active_scrum.number
+                    new.active_scrum.close()
+                    new.save_project()
+                    proj = new
+                    invalidate_views(proj, sprint_num, scrum_num)
+                    refresh = True
         elif request.path == '/close_sprint':
-            if proj.active_sprint:
-                proj.active_sprint.close()
-                proj.save_project()
-                re_load = True
+            with write_lock:
+                sync()
+                if proj.active_sprint:
+                    new = proj.copy()
+                    sprint_num = new.active_sprint.number
+                    new.active_sprint.close()
+                    new.save_project()
+                    proj = new
+                    invalidate_views(proj, sprint_num)
+                    refresh = True
         elif request.path == '/new_scrum':
-            if proj.active_sprint:
-                proj.active_sprint.new_scrum()
-                proj.save_project()
-                re_load = True
+            with write_lock:
+                sync()
+                if proj.active_sprint:
+                    new = proj.copy()
+                    new.active_sprint.new_scrum()
+                    new.save_project()
+                    proj = new
+                    invalidate_views(proj, proj.active_sprint.number)
+                    refresh = True
         elif request.path == '/new_sprint':
-            if not proj.active_sprint:
-                proj.new_sprint()
-                proj.save_project()
-                re_load = True
+            with write_lock:
+                sync()
+                if not proj.active_sprint:
+                    new = proj.copy()
+                    new.new_sprint()
+                    new.save_project()
+                    proj = new
+                    invalidate_views(proj, proj.active_sprint.number)
+                    refresh = True
         elif request.path == '/task_add':
-            re_load = proj.active_sprint.add_tasks(request.GET)
+            assert project.active_sprint
+            tasks = project.active_sprint.fetch_tasks(request.GET)   #  Gitlab may be slow, not under write_lock.
+            with write_lock:
+                sync()
+                if proj.active_sprint:      #  Not closed meanwhile.
+                    new = proj.copy()
+                    refresh = new.active_sprint.add_tasks(tasks)
+                    if refresh:
+                        proj = new
+                        invalidate_views(proj, proj.active_sprint.number)
         elif request.path == '/cli':
-            re_load = proj.project_edit(request.GET)
-            if re_load:
-                proj.save_project()
+            with write_lock:
+                sync()
+                new = proj.copy(all_sprints=True)
+                refresh = new.project_edit(request.GET)
+                if refresh:
+                    new.save_project()
+                    proj = new
+                    invalidate_views(proj)
         else:
             return HttpResponse('Invalid request path, sorry.')
 
-        if re_load:
-            data = Data()          #  Get Repo data.
-            proj = Project(data)   #  Global. Process and store repo data.
-            view = View(proj)      #  Global. Initialize first page to view.
-
-        task_list, blocker_list, sort_column, sort_order = view.get_view()   # Generate view data.
-
-        if blocker_list:
-            blocker_label = 'Blockers:'
-            nblk = len(blocker_list)
-            bot_height = MIN_BOT_HEIGHT + (BLK_HEIGHT * nblk)    #  Height of bot_frame (blockers) screen frame.
-            if bot_height > MAX_BOT_HEIGHT:
-                bot_height = MAX_BOT_HEIGHT
-        else:
-            blocker_label = 'Blockers: None'
-            bot_height = MIN_BOT_HEIGHT
+        if refresh:
+            project = proj
+            view = View(project)   #  Back to the first page to view.
 
     else:
         return HttpResponse('Invalid request method (%s). Only GET requests accepted, sorry.' % request.method)
 
+    if request.path in ('/', '/last'):
+        #
+        #  Pages polled by wall boards and idle tabs: answer unchanged
+        #  pages with a 304 Not Modified, without rendering them.
+        #
+        etag = view.make_etag()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(render_board(view))
+        response['ETag']          = etag
+        response['Last-Modified'] = http_date(project.version)
+        response['Cache-Control'] = 'no-cache'
+    else:
+        response = HttpResponse(render_board(view))
+
+    #
+    #  Render the views a click away while the user looks at this one.
+    #  After a write this view is the latest, warmed for everyone else.
+    #
+    prewarm(project, view.get_state())
+
+    response.set_cookie(VIEW_COOKIE, view.get_state(), max_age=VIEW_COOKIE_AGE, samesite='Lax')
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def render_board(view):
+    #
+    #  Returns the HTML of the main page for a view.
+    #
+    #  Rendered pages are cached by view and by the project wide parts of
+    #  the page, see View.make_page_tag().
+    #
+    proj = view.project
+
     dev_list = []
     if proj.active_sprint and proj.active_scrum:
         for dev in proj.active_sprint.dev_list:
@@ -2358,11 +4158,35 @@ def index(request):
     scrum_on = True if proj.active_scrum else False
     sprint_on = True if proj.active_sprint else False
 
+    #
+    #  The year matters too, sprint dates show it only if not this year.
+    #
+    page_vars = (dev_list, scrum_on, sprint_on, scrum_active, view.get_num_sprints(), time.strftime('%Y'))
+    key = view.make_page_tag(page_vars)
+    html = cache.get(key)
+    if html:
+        return html
+
+    task_rows, blocker_rows, sort_column, sort_order = view.get_view()   # Generate view data.
+
+    task_list    = [row.html() for row in task_rows]
+    blocker_list = [row.blocker_html() for row in blocker_rows]
+
+    if blocker_list:
+        blocker_label = 'Blockers:'
+        nblk = len(blocker_list)
+        bot_height = MIN_BOT_HEIGHT + (BLK_HEIGHT * nblk)    #  Height of bot_frame (blockers) screen frame.
+        if bot_height > MAX_BOT_HEIGHT:
+            bot_height = MAX_BOT_HEIGHT
+    else:
+        blocker_label = 'Blockers: None'
+        bot_height = MIN_BOT_HEIGHT
+
     mid_height = 100.5 - MIN_TOP_HEIGHT - bot_height - 3   #  Height of middle screen frame.
     #
     # Render view.
     #
-    t = Template(page)
+    t = get_template('page')
     c = Context({'task_list'   : task_list,
                  'blk_list'    : blocker_list,
                  'dev_list'    : dev_list,
@@ -2381,7 +4205,9 @@ def index(request):
                  'mid_height'  : mid_height,
                  'bot_height'  : bot_height
     })
-    return  HttpResponse(t.render(c))
+    html = t.render(c)
+    cache.set(key, html, view.get_expiration())
+    return html
 
 urlpatterns = (
     url(r'^$', index),
@@ -2404,12 +4230,41 @@ urlpatterns = (
     url(r'task_add', index),
     url(r'task_delete', index),
     url(r'cli', index),
+    url(r'sprintview.css', index),
+    url(r'stats', index),
 )
 
 application = get_wsgi_application()
 
+if __name__ != "__main__" and WARM_UP:
+    #
+    #  Imported by a WSGI server.
+    #
+    warm_up()
+
 if __name__ == "__main__":
 
     from django.core.management import execute_from_command_line
 
+    #
+    #  Warm up the server process of runserver, not the autoreloader
+    #  process which only watches the source and restarts the server.
+    #
+    if sys.argv[1:2] == ['shard']:
+        init()
+        shard_data()
+        sys.exit(0)
+
+    if sys.argv[1:2] in (['import'], ['export']) and len(sys.argv) == 3:
+        init()
+        if sys.argv[1] == 'import':
+            import_data(sys.argv[2])
+        else:
+            export_data(sys.argv[2])
+        sys.exit(0)
+
+    if WARM_UP and sys.argv[1:2] == ['runserver']:
+        if os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv:
+            warm_up()
+
     execute_from_command_line(sys.argv)
@@ -0,0 +1,168 @@
+#
+#  Sprint View tests.
+#
+#  Run from the top directory with:
+#
+#     python -m pytest tests
+#
+#  Each test starts from a fresh copy of the sample project_data, in a
+#  temporary directory, served through the Django test client.
+#
+import io
+import os
+import sys
+import json
+import glob
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP  = tempfile.mkdtemp()
+
+os.environ['SPRINTVIEW_PATH']    = os.path.join(TMP, 'project_data')
+os.environ['SPRINTVIEW_LOGDIR']  = TMP
+os.environ['SPRINTVIEW_WARM_UP'] = 'off'
+os.environ['SPRINTVIEW_PREWARM'] = 'off'
+os.environ['DEBUG']              = 'off'
+shutil.copy(os.path.join(ROOT, 'project_data'), os.environ['SPRINTVIEW_PATH'])
+
+sys.path.insert(0, ROOT)
+import sprintview as sv
+from django.test import Client
+
+
+class BoardTest(unittest.TestCase):
+    def setUp(self):
+        for path in glob.glob(sv.DATA_FILE + '*'):
+            os.remove(path)     #  Data file, its backups and journal.
+        shutil.copy(os.path.join(ROOT, 'project_data'), sv.DATA_FILE)
+        sv.cache.clear()
+        if not sv.inited:
+            sv.init()
+            sv.inited = True
+        sv.load()
+        self.client = Client(HTTP_HOST='localhost')
+
+    def get(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        return response
+
+    def test_close_scrum_then_sprint(self):
+        #
+        #  Closing the scrum first, then the sprint, leaves no active sprint.
+        #
+        self.get('/close_scrum')
+        self.get('/close_sprint')
+        self.assertIsNone(sv.proj.active_sprint)
+        self.assertIsNone(sv.proj.active_scrum)
+
+        num_sprints = sv.proj.num_sprints
+        self.get('/new_sprint')
+        self.assertEqual(sv.proj.num_sprints, num_sprints + 1)
+        self.assertTrue(sv.proj.active_sprint.active)
+        self.assertTrue(sv.proj.active_scrum.active)
+
+    def test_torn_journal_record(self):
+        #
+        #  A record torn by a crash is dropped, the updates after it are kept.
+        #
+        sv.JOURNAL = True
+        try:
+            self.get('/update?progress_matt:259=60')
+            with open(sv.JOURNAL_FILE, 'a') as f:
+                f.write('{"op": "task_update", "spr')
+            sv.load()
+            self.get('/update?progress_matt:259=80')
+            sv.load()
+            task = sv.proj.active_scrum.get_task('matt:259')
+            self.assertEqual(int(task.progress), 80)
+        finally:
+            sv.JOURNAL = False
+
+    def test_etag_survives_reload(self):
+        #
+        #  Another worker process, or a restart, reading the same data gives
+        #  the same ETag, and answers 304.
+        #
+        etag = self.get('/')['ETag']
+        sv.load()
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_old_snapshot_keeps_its_cache_keys(self):
+        #
+        #  A request still reading the project as it was before an update
+        #  caches its views under the old keys, not under the new ones.
+        #
+        old = sv.proj
+        tag = sv.View(old)._make_cache_tag()
+        self.get('/update?progress_matt:259=60')
+        self.assertIsNot(sv.proj, old)
+        self.assertEqual(sv.View(old)._make_cache_tag(), tag)
+        self.assertNotEqual(sv.View(sv.proj)._make_cache_tag(), tag)
+
+    def test_add_tasks_with_a_bad_issue(self):
+        #
+        #  A bad Gitlab reply for one issue skips that issue only.  Issues
+        #  are fetched before taking write_lock, not to hold up other writers.
+        #
+        replies = {
+            '9101': '[{"iid": 9101, "title": "One", "assignee": {"username": "matt"}}]',
+            '9102': '{"message": "500 Internal Server Error"}',
+            '9103': '<html>Bad gateway</html>',
+            '9104': '[{"iid": 9104, "title": "Four", "assignee": {"username": "matt"}}]',
+        }
+
+        def get_issue(issue_id, headers=None):
+            self.assertFalse(sv.write_lock.lock.locked())
+            return FakeResponse(200, replies[str(issue_id)])
+
+        with mock.patch.object(sv.gitlab, 'get_issue', get_issue):
+            self.get('/task_add?issue_list=9101,9102,9103,9104')
+
+        sprint = sv.proj.active_sprint
+        self.assertTrue(sprint.task_exists('matt:9101'))
+        self.assertTrue(sprint.task_exists('matt:9104'))
+        self.assertEqual([t.issue for t in sprint.task_list if t.issue in (9102, 9103)], [])
+
+    def test_remove_sprint_with_more_sprints_than_cached(self):
+        #
+        #  Renumbering after sprm goes through every sprint, more than are
+        #  kept as objects.
+        #
+        with mock.patch.object(sv, 'SPRINT_CACHE_SIZE', 2):
+            sv.load()
+            num_sprints = sv.proj.num_sprints
+            self.get('/cli?cli_text=sprm:1')
+            numbers = [spr.number for spr in sv.proj.sprint_list]
+            self.assertEqual(numbers, list(range(1, num_sprints)))
+            sv.load()
+            numbers = [spr.number for spr in sv.proj.sprint_list]
+            self.assertEqual(numbers, list(range(1, num_sprints)))
+
+
+class JsonReaderTest(unittest.TestCase):
+    def test_numbers_cut_between_pieces(self):
+        #
+        #  Numbers read in pieces as small as one character parse whole.
+        #
+        text = '{"f": 1.5e10, "g": -0.25, "h": 12E-3, "sprint_list": [7, 2.0]}'
+        for chunk in (1, 2, 3, 7):
+            with mock.patch.object(sv, 'JSON_CHUNK', chunk):
+                data, size = sv.load_json(io.StringIO(text))
+            self.assertEqual(data, json.loads(text), chunk)
+            self.assertEqual(size, len(text))
+
+
+class FakeResponse:
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text        = text
+        self.headers     = {}
+
+
+if __name__ == '__main__':
+    unittest.main()